@@ -1,19 +1,33 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Query, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Query, Header, UploadFile, File, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse, StreamingResponse, FileResponse
+from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, UpdateMany, IndexModel, ReturnDocument, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure, DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin
+from collections import OrderedDict, defaultdict
 import uuid
+import time
+import hashlib
+import re
+import bisect
+import base64
+import html
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from enum import Enum
 import jwt
+import orjson
 from passlib.context import CryptContext
-import pandas as pd
 import io
 
 ROOT_DIR = Path(__file__).parent
@@ -35,6 +49,93 @@ security = HTTPBearer()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = "your-secret-key-here"  # In production, use environment variable
 
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', '720'))
+TOKEN_VERSION_REFRESH_SECONDS = float(os.environ.get('TOKEN_VERSION_REFRESH_SECONDS', '30'))
+# User fields that are carried in (or protect) the token; changing any of them revokes it
+TOKEN_CLAIM_FIELDS = {"username", "password_hash", "role", "full_name", "is_active"}
+
+# Password hashing pool settings (bcrypt runs outside the event loop)
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '32'))
+
+# In-process menu snapshot: rebuilt after local writes, and when the shared menu version
+# moves (checked at most this often) because another worker wrote
+MENU_SNAPSHOT_CHECK_SECONDS = float(os.environ.get('MENU_SNAPSHOT_CHECK_SECONDS', '1'))
+MENU_SNAPSHOT_MAX_AGE_SECONDS = float(os.environ.get('MENU_SNAPSHOT_MAX_AGE_SECONDS', '300'))
+
+# Versions re-sent by /menu/changes to cover writes that committed out of version order
+MENU_CHANGES_OVERLAP_VERSIONS = int(os.environ.get('MENU_CHANGES_OVERLAP_VERSIONS', '5'))
+# Deletions are reported this long; clients asking for changes since before a dropped
+# tombstone are told to reload the full menu
+MENU_TOMBSTONE_TTL_SECONDS = int(os.environ.get('MENU_TOMBSTONE_TTL_SECONDS', str(7 * 24 * 3600)))
+
+# Keyset pagination of /menu and /menu/all
+MENU_PAGE_DEFAULT_LIMIT = int(os.environ.get('MENU_PAGE_DEFAULT_LIMIT', '200'))
+MENU_PAGE_MAX_LIMIT = int(os.environ.get('MENU_PAGE_MAX_LIMIT', '1000'))
+MENU_PAGE_BATCH_SIZE = int(os.environ.get('MENU_PAGE_BATCH_SIZE', '200'))
+
+# Availability WebSocket: clients that take longer than this to accept a message are dropped
+MENU_BROADCAST_SEND_TIMEOUT_SECONDS = float(os.environ.get('MENU_BROADCAST_SEND_TIMEOUT_SECONDS', '2'))
+# How often each worker checks the menu version for writes made by other workers
+MENU_AVAILABILITY_POLL_SECONDS = float(os.environ.get('MENU_AVAILABILITY_POLL_SECONDS', '1'))
+# How long changed items are re-read after the version moves, for writes that commit late
+MENU_AVAILABILITY_SETTLE_SECONDS = float(os.environ.get('MENU_AVAILABILITY_SETTLE_SECONDS', '5'))
+
+# Largest number of items accepted by one POST /menu/bulk
+MENU_BULK_MAX_ITEMS = int(os.environ.get('MENU_BULK_MAX_ITEMS', '1000'))
+
+# Menu images: originals and pre-generated thumbnails on local disk, named by content hash
+MENU_IMAGE_DIR = Path(os.environ.get('MENU_IMAGE_DIR', str(ROOT_DIR / 'uploads' / 'menu')))
+MENU_IMAGE_MAX_BYTES = int(os.environ.get('MENU_IMAGE_MAX_BYTES', str(10 * 1024 * 1024)))
+MENU_IMAGE_MAX_PIXELS = int(os.environ.get('MENU_IMAGE_MAX_PIXELS', str(40_000_000)))
+MENU_IMAGE_WORKERS = int(os.environ.get('MENU_IMAGE_WORKERS', '2'))
+MENU_IMAGE_MAX_PENDING = int(os.environ.get('MENU_IMAGE_MAX_PENDING', '8'))
+# Thumbnail name -> longest side in pixels
+MENU_IMAGE_SIZES = {"thumb": 320, "tablet": 1024}
+
+# Public QR-code menu: pre-rendered files any static file server can serve
+PUBLIC_MENU_DIR = Path(os.environ.get('PUBLIC_MENU_DIR', str(ROOT_DIR / 'public_menu')))
+# Where PUBLIC_MENU_DIR is served as plain files: mounted on this app, and a front proxy
+# can serve the same path straight from disk
+PUBLIC_MENU_STATIC_PATH = os.environ.get('PUBLIC_MENU_STATIC_PATH', '/api/public-menu')
+# Address printed in the table QR codes: the published index.html. The rate-limited dynamic
+# /public/menu.html is only printed while no snapshot has been published yet. Relative
+# addresses are resolved against the address the admin reached this server on
+PUBLIC_MENU_URL = os.environ.get('PUBLIC_MENU_URL', f'{PUBLIC_MENU_STATIC_PATH}/index.html')
+PUBLIC_MENU_FALLBACK_URL = '/api/public/menu.html'
+# Coalesces bursts of menu writes (e.g. an XLSX import) into one re-render
+PUBLIC_MENU_DEBOUNCE_SECONDS = float(os.environ.get('PUBLIC_MENU_DEBOUNCE_SECONDS', '2'))
+# How often to check the menu version for writes made by other workers
+PUBLIC_MENU_CHECK_SECONDS = float(os.environ.get('PUBLIC_MENU_CHECK_SECONDS', '30'))
+# Requests per client IP per window on the dynamic /public/menu fallback
+PUBLIC_MENU_RATE_LIMIT = int(os.environ.get('PUBLIC_MENU_RATE_LIMIT', '60'))
+PUBLIC_MENU_RATE_WINDOW_SECONDS = float(os.environ.get('PUBLIC_MENU_RATE_WINDOW_SECONDS', '60'))
+# Use the last X-Forwarded-For hop as the client IP (only behind a trusted proxy)
+TRUST_FORWARDED_FOR = os.environ.get('TRUST_FORWARDED_FOR', 'false').lower() == 'true'
+
+# Tables the waitress interface offers and the QR codes are printed for
+TABLE_NUMBERS = list(range(1, 29))
+
+# In-process user cache settings
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '60'))
+USER_CACHE_MAX_SIZE = int(os.environ.get('USER_CACHE_MAX_SIZE', '1024'))
+
+# Idempotency-Key handling for POST /orders
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_SECONDS', str(24 * 3600)))
+# A key reserved this long ago without an order is treated as abandoned and can be reused
+IDEMPOTENCY_PENDING_TIMEOUT_SECONDS = float(os.environ.get('IDEMPOTENCY_PENDING_TIMEOUT_SECONDS', '30'))
+IDEMPOTENCY_CACHE_TTL_SECONDS = float(os.environ.get('IDEMPOTENCY_CACHE_TTL_SECONDS', '600'))
+IDEMPOTENCY_CACHE_MAX_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_MAX_SIZE', '4096'))
+
+# Kitchen and bar queue WebSockets, fed from the order_events log
+# Events are kept this long; screens reconnecting with an older ?since= get a fresh snapshot
+ORDER_EVENT_TTL_SECONDS = int(os.environ.get('ORDER_EVENT_TTL_SECONDS', '3600'))
+# How often each worker picks up events written by other workers
+ORDER_EVENT_POLL_SECONDS = float(os.environ.get('ORDER_EVENT_POLL_SECONDS', '1'))
+# How long a sequence number that was allocated but not yet written holds back later events
+ORDER_EVENT_GAP_WAIT_SECONDS = float(os.environ.get('ORDER_EVENT_GAP_WAIT_SECONDS', '2'))
+STATION_SEND_TIMEOUT_SECONDS = float(os.environ.get('STATION_SEND_TIMEOUT_SECONDS', '2'))
+
 # Enums
 class OrderStatus(str, Enum):
     PENDING = "pending"
@@ -69,7 +170,9 @@ class Category(BaseModel):
     department: Department = Department.KITCHEN  # Новое поле для отдела
     sort_order: int = 0
     is_active: bool = True
+    version: int = 0  # Menu version of the last change (see /menu/changes)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class CategoryCreate(BaseModel):
     name: str
@@ -98,6 +201,7 @@ class User(BaseModel):
     email: Optional[str] = None
     phone: Optional[str] = None
     is_active: bool = True
+    token_version: int = 0  # Bumped to revoke all tokens issued for this user
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -129,6 +233,14 @@ class Token(BaseModel):
     role: UserRole
     full_name: str
 
+class TokenUser(BaseModel):
+    """Principal reconstructed from JWT claims, without a database lookup"""
+    id: str
+    role: UserRole
+    full_name: str
+    is_active: bool
+    token_version: int
+
 class UserResponse(BaseModel):
     id: str
     username: str
@@ -141,6 +253,17 @@ class UserResponse(BaseModel):
     updated_at: datetime
 
 # Menu Models
+class MenuImageVariant(BaseModel):
+    webp: str
+    jpeg: str
+
+class MenuItemImages(BaseModel):
+    original: str
+    thumb: MenuImageVariant
+    tablet: MenuImageVariant
+    width: int
+    height: int
+
 class MenuItem(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -154,6 +277,14 @@ class MenuItem(BaseModel):
     bottle_available: bool = False
     bottle_price: Optional[float] = None
     image_url: Optional[str] = None
+    images: Optional[MenuItemImages] = None  # Set by the image upload endpoint
+    version: int = 0  # Menu version of the last change (see /menu/changes)
+    # Copied from the category (see category_fields) so menu reads need no $lookup
+    category_name: Optional[str] = None
+    category_display_name: Optional[str] = None
+    category_emoji: Optional[str] = None
+    category_sort_order: int = 0
+    category_is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -177,6 +308,23 @@ class MenuItemUpdate(BaseModel):
     bottle_available: Optional[bool] = None
     bottle_price: Optional[float] = None
 
+class MenuItemBulkUpdate(MenuItemUpdate):
+    id: str
+
+class MenuBulkUpdate(BaseModel):
+    items: List[MenuItemBulkUpdate] = Field(..., min_length=1, max_length=MENU_BULK_MAX_ITEMS)
+
+class MenuBulkItemResult(BaseModel):
+    id: str
+    status: str  # updated, unchanged, not_found, invalid
+    error: Optional[str] = None
+
+class MenuBulkUpdateResult(BaseModel):
+    version: Optional[int] = None
+    updated: int
+    failed: int
+    results: List[MenuBulkItemResult]
+
 class MenuItemWithCategory(BaseModel):
     id: str
     name: str
@@ -192,6 +340,7 @@ class MenuItemWithCategory(BaseModel):
     bottle_available: bool
     bottle_price: Optional[float] = None
     image_url: Optional[str] = None
+    images: Optional[MenuItemImages] = None
     created_at: datetime
     updated_at: datetime
 
@@ -256,6 +405,214 @@ class ClientOrderUpdate(BaseModel):
     client_id: str
     status: OrderStatus
 
+# In-process caching
+class TTLCache:
+    """Small LRU cache whose entries also expire after a fixed TTL.
+
+    Keeps hit/miss/eviction counters so the saved DB lookups can be reported.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+# Principals resolved by get_current_user, keyed by user id
+user_cache = TTLCache(max_size=USER_CACHE_MAX_SIZE, ttl_seconds=USER_CACHE_TTL_SECONDS)
+# Completed order idempotency keys: scoped key -> (request hash, order id)
+recent_idempotency_keys = TTLCache(max_size=IDEMPOTENCY_CACHE_MAX_SIZE, ttl_seconds=IDEMPOTENCY_CACHE_TTL_SECONDS)
+
+class TokenVersionTable:
+    """Current token_version/is_active per user, refreshed from db.users in bulk.
+
+    Tokens are checked against this table instead of reading the user per request.
+    Writes made by this process update it directly; writes made by other workers
+    are picked up on the next periodic refresh. token_version only ever grows (an
+    is_active change bumps it too), so a refresh read before a local write is merged
+    into the table rather than replacing it, and can never bring back a revoked token.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._versions = {}
+        # Ids with no user, cached until the next refresh
+        self._missing = set()
+        # Ids set / removed by this process while a refresh read is in flight
+        self._written = set()
+        self._removed = set()
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _newer(current: Tuple[int, bool], entry: Tuple[int, bool]) -> Tuple[int, bool]:
+        """The higher token_version wins; for the same version a disabled copy wins"""
+        if current[0] != entry[0]:
+            return max(current, entry)
+        return current[0], current[1] and entry[1]
+
+    def _merge(self, user_id: str, entry: Tuple[int, bool]):
+        current = self._versions.get(user_id)
+        self._versions[user_id] = entry if current is None else self._newer(current, entry)
+
+    async def _refresh_if_stale(self):
+        if time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        async with self._lock:
+            if time.monotonic() - self._loaded_at < self.refresh_seconds:
+                return
+            self._missing = set()
+            self._written = set()
+            self._removed = set()
+            users = await db.users.find(
+                {}, {"_id": 0, "id": 1, "token_version": 1, "is_active": 1}
+            ).to_list(None)
+            versions = {}
+            for user in users:
+                if user["id"] in self._removed:
+                    continue
+                entry = (user.get("token_version", 0), user.get("is_active", True))
+                current = self._versions.get(user["id"])
+                versions[user["id"]] = entry if current is None else self._newer(current, entry)
+            # Users this process wrote after the read started, e.g. ones created meanwhile
+            for user_id in self._written - versions.keys():
+                versions[user_id] = self._versions[user_id]
+            self._versions = versions
+            self._loaded_at = time.monotonic()
+
+    async def get(self, user_id: str):
+        """Return (token_version, is_active) for a user, or None if the user does not exist"""
+        await self._refresh_if_stale()
+        entry = self._versions.get(user_id)
+        if entry is None:
+            if user_id in self._missing:
+                return None
+            # Users created by another worker since the last refresh
+            user = await db.users.find_one(
+                {"id": user_id}, {"_id": 0, "token_version": 1, "is_active": 1}
+            )
+            if user is None:
+                if user_id not in self._versions:
+                    self._missing.add(user_id)
+                return self._versions.get(user_id)
+            self._merge(user_id, (user.get("token_version", 0), user.get("is_active", True)))
+            entry = self._versions[user_id]
+        return entry
+
+    def set(self, user_id: str, token_version: int, is_active: bool):
+        self._merge(user_id, (token_version, is_active))
+        self._missing.discard(user_id)
+        self._written.add(user_id)
+        self._removed.discard(user_id)
+
+    def remove(self, user_id: str):
+        self._versions.pop(user_id, None)
+        self._written.discard(user_id)
+        self._removed.add(user_id)
+
+token_versions = TokenVersionTable(refresh_seconds=TOKEN_VERSION_REFRESH_SECONDS)
+
+class BoundedWorkerPool:
+    """Thread pool for blocking CPU work with a cap on queued + running jobs.
+
+    Jobs submitted while the pool is saturated are rejected with 503 instead of
+    piling up behind each other and holding client connections open.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, thread_name_prefix: str):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+password_hash_pool = BoundedWorkerPool(
+    max_workers=PASSWORD_HASH_WORKERS,
+    max_pending=PASSWORD_HASH_MAX_PENDING,
+    thread_name_prefix="bcrypt"
+)
+
+menu_image_pool = BoundedWorkerPool(
+    max_workers=MENU_IMAGE_WORKERS,
+    max_pending=MENU_IMAGE_MAX_PENDING,
+    thread_name_prefix="menu-image"
+)
+
 # Authentication functions
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -263,18 +620,39 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_hash_pool.run(get_password_hash, password)
+
 def create_access_token(data: dict):
-    return jwt.encode(data, SECRET_KEY, algorithm="HS256")
+    now = datetime.utcnow()
+    claims = {**data, "iat": now, "exp": now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)}
+    return jwt.encode(claims, SECRET_KEY, algorithm="HS256")
+
+def create_user_access_token(user: dict):
+    """Issue a token carrying every claim require_role needs"""
+    return create_access_token(data={
+        "user_id": user["id"],
+        "role": user["role"],
+        "full_name": user["full_name"],
+        "is_active": user.get("is_active", True),
+        "tv": user.get("token_version", 0)
+    })
 
 def verify_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        payload = jwt.decode(
+            token, SECRET_KEY, algorithms=["HS256"],
+            options={"require": ["exp", "user_id", "role", "full_name", "tv"]}
+        )
         return payload
     except jwt.PyJWTError:
         return None
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+async def token_user_from_token(token: str) -> TokenUser:
+    """Validate a bearer token (from the header or a WebSocket query parameter)"""
     payload = verify_token(token)
     if payload is None:
         raise HTTPException(
@@ -283,7 +661,33 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = await db.users.find_one({"id": payload.get("user_id")})
+    current = await token_versions.get(payload["user_id"])
+    if current is None or current[0] != payload["tv"] or not current[1]:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return TokenUser(
+        id=payload["user_id"],
+        role=payload["role"],
+        full_name=payload["full_name"],
+        is_active=current[1],
+        token_version=payload["tv"]
+    )
+
+async def get_token_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Authenticate from the token claims alone, checking only the in-memory token version"""
+    return await token_user_from_token(credentials.credentials)
+
+async def get_current_user(token_user: TokenUser = Depends(get_token_user)):
+    user_id = token_user.id
+    cached_user = user_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+    
+    user = await db.users.find_one({"id": user_id})
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -291,10 +695,12 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return User(**user)
+    current_user = User(**user)
+    user_cache.set(user_id, current_user)
+    return current_user
 
 def require_role(allowed_roles: List[UserRole]):
-    def role_checker(current_user: User = Depends(get_current_user)):
+    def role_checker(current_user: TokenUser = Depends(get_token_user)):
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -303,6 +709,230 @@ def require_role(allowed_roles: List[UserRole]):
         return current_user
     return role_checker
 
+# Index registry: every index the endpoints rely on, declared per collection
+INDEX_REGISTRY = {
+    "orders": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+        # get_orders (waitress) and waitress dashboard stats
+        IndexModel([("waitress_id", ASCENDING), ("created_at", DESCENDING)], name="waitress_id_1_created_at_-1"),
+        # get_orders (other roles) and get_admin_orders date ranges
+        IndexModel([("created_at", DESCENDING)], name="created_at_-1"),
+        # Dashboard status counts
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_1_created_at_1"),
+        # get_kitchen_orders / get_bar_orders: only orders with the station's items are indexed
+        IndexModel(
+            [("status", ASCENDING), ("created_at", ASCENDING), ("has_food_items", ASCENDING)],
+            name="status_1_created_at_1_has_food_items_1",
+            partialFilterExpression={"has_food_items": True}
+        ),
+        IndexModel(
+            [("status", ASCENDING), ("created_at", ASCENDING), ("has_drink_items", ASCENDING)],
+            name="status_1_created_at_1_has_drink_items_1",
+            partialFilterExpression={"has_drink_items": True}
+        ),
+        # get_orders_by_table
+        IndexModel([("table_number", ASCENDING), ("created_at", DESCENDING)], name="table_number_1_created_at_-1"),
+    ],
+    "menu_items": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+        # delete_category item counts and update_category propagation
+        IndexModel([("category_id", ASCENDING), ("name", ASCENDING), ("id", ASCENDING)], name="category_id_1_name_1_id_1"),
+        # Menu snapshot build, get_all_menu_items pages and streams (MENU_ITEM_SORT)
+        IndexModel(
+            [("category_sort_order", ASCENDING), ("category_id", ASCENDING), ("name", ASCENDING), ("id", ASCENDING)],
+            name="category_sort_order_1_category_id_1_name_1_id_1"
+        ),
+        # get_menu pages and streams (active categories, MENU_ITEM_SORT)
+        IndexModel(
+            [("category_is_active", ASCENDING), ("category_sort_order", ASCENDING), ("category_id", ASCENDING),
+             ("name", ASCENDING), ("id", ASCENDING)],
+            name="category_is_active_1_category_sort_order_1_category_id_1_name_1_id_1"
+        ),
+        # XLSX import and default menu name lookups
+        IndexModel([("name", ASCENDING)], name="name_1"),
+        # dashboard availability counts
+        IndexModel([("available", ASCENDING)], name="available_1"),
+        # get_menu_changes
+        IndexModel([("version", ASCENDING)], name="version_1"),
+    ],
+    "categories": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+        # Enforces unique category names for create_category/update_category
+        IndexModel([("name", ASCENDING)], name="name_1", unique=True),
+        # Dashboard active category count (get_categories reads the menu snapshot)
+        IndexModel([("is_active", ASCENDING), ("sort_order", ASCENDING)], name="is_active_1_sort_order_1"),
+        # menu snapshot category list
+        IndexModel([("sort_order", ASCENDING)], name="sort_order_1"),
+        # get_menu_changes
+        IndexModel([("version", ASCENDING)], name="version_1"),
+    ],
+    "menu_tombstones": [
+        # get_menu_changes
+        IndexModel([("version", ASCENDING)], name="version_1"),
+        # prune_menu_tombstones
+        IndexModel([("deleted_at", ASCENDING)], name="deleted_at_1"),
+    ],
+    "order_idempotency_keys": [
+        # Keys are looked up by _id; MongoDB removes them after IDEMPOTENCY_KEY_TTL_SECONDS
+        IndexModel([("created_at", ASCENDING)], name="created_at_1", expireAfterSeconds=IDEMPOTENCY_KEY_TTL_SECONDS),
+    ],
+    "order_events": [
+        # Events are read by _id (their sequence number); MongoDB removes them after ORDER_EVENT_TTL_SECONDS
+        IndexModel([("created_at", ASCENDING)], name="created_at_1", expireAfterSeconds=ORDER_EVENT_TTL_SECONDS),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+        # Enforces unique usernames for create_user/update_user
+        IndexModel([("username", ASCENDING)], name="username_1", unique=True),
+        # get_users
+        IndexModel([("created_at", DESCENDING)], name="created_at_-1"),
+    ],
+}
+
+# Indexes no query uses any more; ensure_indexes drops them so writes stop maintaining them
+RETIRED_INDEXES = {
+    # get_menu_by_type reads the menu snapshot
+    "menu_items": ["item_type_1_name_1"],
+}
+
+# IndexOptionsConflict / IndexKeySpecsConflict: an index exists with another definition
+INDEX_CONFLICT_CODES = (85, 86)
+
+def _index_key(key_pairs) -> list:
+    return [(field, int(direction)) for field, direction in key_pairs]
+
+def _index_matches(declared: dict, existing: dict) -> bool:
+    """Compare a declared IndexModel document with an index_information() entry"""
+    return (
+        _index_key(declared["key"].items()) == _index_key(existing["key"])
+        and declared.get("unique", False) == existing.get("unique", False)
+        and declared.get("partialFilterExpression") == existing.get("partialFilterExpression")
+        and declared.get("expireAfterSeconds") == existing.get("expireAfterSeconds")
+    )
+
+async def _duplicate_keys(collection, index: IndexModel, limit: int = 5) -> list:
+    """Key values that more than one document holds, which would make a unique index build fail"""
+    declared = index.document
+    pipeline = []
+    if "partialFilterExpression" in declared:
+        pipeline.append({"$match": declared["partialFilterExpression"]})
+    pipeline += [
+        {"$group": {"_id": {f"k{i}": f"${field}" for i, field in enumerate(declared["key"])}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    return [list(group["_id"].values()) async for group in collection.aggregate(pipeline)]
+
+def _index_model_from_info(name: str, info: dict) -> IndexModel:
+    """Rebuild an IndexModel from an index_information() entry"""
+    options = {key: value for key, value in info.items() if key not in ("key", "v", "ns")}
+    return IndexModel(info["key"], name=name, **options)
+
+async def _replace_conflicting_index(collection, index: IndexModel):
+    """Drop whatever index clashes with a declared one by name or keys, then create it.
+
+    A unique index is only swapped in once the collection has no duplicate keys, and
+    if the new build still fails the dropped indexes are restored, so a failed
+    rebuild never leaves the collection without the index it had.
+    """
+    declared = index.document
+    if declared.get("unique"):
+        duplicates = await _duplicate_keys(collection, index)
+        if duplicates:
+            raise OperationFailure(
+                f"duplicate keys {duplicates} prevent building unique index {declared['name']}; "
+                "the existing index was kept",
+                code=11000
+            )
+    
+    conflicting = {
+        name: info for name, info in (await collection.index_information()).items()
+        if name != "_id_" and (name == declared["name"] or _index_key(info["key"]) == _index_key(declared["key"].items()))
+    }
+    for name in conflicting:
+        await collection.drop_index(name)
+    try:
+        await collection.create_indexes([index])
+    except OperationFailure:
+        await collection.create_indexes([_index_model_from_info(name, info) for name, info in conflicting.items()])
+        raise
+
+async def missing_unique_indexes() -> list:
+    """Declared unique indexes that do not exist as declared ("collection.index" names)"""
+    report = await index_report()
+    return [
+        f"{collection_name}.{index.document['name']}"
+        for collection_name, indexes in INDEX_REGISTRY.items()
+        for index in indexes
+        if index.document.get("unique") and index.document["name"] not in report[collection_name]["present"]
+    ]
+
+async def ensure_indexes() -> dict:
+    """Apply INDEX_REGISTRY idempotently; returns per-collection errors (empty when all applied)"""
+    errors = {}
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        collection = db[collection_name]
+        try:
+            # Fast path: a single no-op createIndexes when nothing changed
+            await collection.create_indexes(indexes)
+            continue
+        except OperationFailure as e:
+            if e.code not in INDEX_CONFLICT_CODES:
+                logger.error("Failed to create indexes on %s: %s", collection_name, e)
+                errors[collection_name] = [str(e)]
+                continue
+        
+        for index in indexes:
+            try:
+                try:
+                    await collection.create_indexes([index])
+                except OperationFailure as e:
+                    if e.code not in INDEX_CONFLICT_CODES:
+                        raise
+                    logger.info("Recreating index %s.%s with its new definition", collection_name, index.document["name"])
+                    await _replace_conflicting_index(collection, index)
+            except OperationFailure as e:
+                logger.error("Failed to create index %s.%s: %s", collection_name, index.document["name"], e)
+                errors.setdefault(collection_name, []).append(f"{index.document['name']}: {e}")
+    
+    for collection_name, names in RETIRED_INDEXES.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        for name in names:
+            if name not in existing:
+                continue
+            try:
+                await collection.drop_index(name)
+                logger.info("Dropped retired index %s.%s", collection_name, name)
+            except OperationFailure as e:
+                logger.error("Failed to drop retired index %s.%s: %s", collection_name, name, e)
+                errors.setdefault(collection_name, []).append(f"{name}: {e}")
+    return errors
+
+async def index_report() -> dict:
+    """Report which declared indexes exist, are missing or differ from their declaration"""
+    report = {}
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        existing = await db[collection_name].index_information()
+        present, missing, mismatched = [], [], []
+        for index in indexes:
+            declared = index.document
+            info = existing.get(declared["name"])
+            if info is None:
+                missing.append(declared["name"])
+            elif _index_matches(declared, info):
+                present.append(declared["name"])
+            else:
+                mismatched.append(declared["name"])
+        declared_names = {index.document["name"] for index in indexes}
+        report[collection_name] = {
+            "present": present,
+            "missing": missing,
+            "mismatched": mismatched,
+            "undeclared": sorted(name for name in existing if name != "_id_" and name not in declared_names),
+        }
+    return report
+
 # Initialize default data
 async def init_default_data():
     """Initialize default categories, users and menu data"""
@@ -316,15 +946,20 @@ async def init_default_data():
         {"name": "cocktails", "display_name": "Коктейли", "emoji": "🍹", "description": "Алкогольные коктейли", "department": "bar", "sort_order": 5}
     ]
     
-    category_mapping = {}
-    for cat_data in default_categories:
-        existing_cat = await db.categories.find_one({"name": cat_data["name"]})
-        if not existing_cat:
-            category = Category(**cat_data)
-            await db.categories.insert_one(category.dict())
-            category_mapping[cat_data["name"]] = category.id
-        else:
-            category_mapping[cat_data["name"]] = existing_cat["id"]
+    started = time.perf_counter()
+    
+    # Upsert categories in one round trip; existing ones are left untouched
+    await db.categories.bulk_write([
+        UpdateOne({"name": cat_data["name"]}, {"$setOnInsert": Category(**cat_data).dict()}, upsert=True)
+        for cat_data in default_categories
+    ], ordered=False)
+    categories = await db.categories.find(
+        {"name": {"$in": [cat_data["name"] for cat_data in default_categories]}},
+        {"_id": 0}
+    ).to_list(None)
+    category_mapping = {cat["name"]: cat["id"] for cat in categories}
+    categories_by_id = {cat["id"]: cat for cat in categories}
+    categories_done = time.perf_counter()
     
     # Create default users if they don't exist
     default_users = [
@@ -334,17 +969,29 @@ async def init_default_data():
         {"username": "admin1", "password": "password123", "role": UserRole.ADMINISTRATOR, "full_name": "Manager Lisa", "email": "admin@restaurant.com"}
     ]
     
-    for user_data in default_users:
-        existing_user = await db.users.find_one({"username": user_data["username"]})
-        if not existing_user:
-            user = User(
+    # Only hash passwords for users that are actually missing, all at once
+    existing_usernames = {
+        user["username"] for user in await db.users.find(
+            {"username": {"$in": [user_data["username"] for user_data in default_users]}},
+            {"_id": 0, "username": 1}
+        ).to_list(None)
+    }
+    missing_users = [user_data for user_data in default_users if user_data["username"] not in existing_usernames]
+    if missing_users:
+        password_hashes = await asyncio.gather(
+            *(get_password_hash_async(user_data["password"]) for user_data in missing_users)
+        )
+        await db.users.bulk_write([
+            UpdateOne({"username": user_data["username"]}, {"$setOnInsert": User(
                 username=user_data["username"],
-                password_hash=get_password_hash(user_data["password"]),
+                password_hash=password_hash,
                 role=user_data["role"],
                 full_name=user_data["full_name"],
                 email=user_data["email"]
-            )
-            await db.users.insert_one(user.dict())
+            ).dict()}, upsert=True)
+            for user_data, password_hash in zip(missing_users, password_hashes)
+        ], ordered=False)
+    users_done = time.perf_counter()
     
     # Initialize menu data if collection is empty
     count = await db.menu_items.count_documents({})
@@ -372,16 +1019,30 @@ async def init_default_data():
             {"name": "Wine Glass", "description": "Red or white wine by the glass", "price": 7.99, "category_id": category_mapping["beverages"], "item_type": ItemType.DRINK}
         ]
         
-        for item_data in sample_menu:
-            item = MenuItem(**item_data)
-            await db.menu_items.insert_one(item.dict())
+        # Upsert by name so workers starting together don't seed the menu twice
+        await db.menu_items.bulk_write([
+            UpdateOne({"name": item_data["name"]}, {"$setOnInsert": MenuItem(
+                **item_data, **category_fields(categories_by_id[item_data["category_id"]])
+            ).dict()}, upsert=True)
+            for item_data in sample_menu
+        ], ordered=False)
+    menu_done = time.perf_counter()
+    
+    logger.info(
+        "Default data initialized in %.1f ms (categories %.1f ms, users %.1f ms, %d hashed, menu %.1f ms)",
+        (menu_done - started) * 1000,
+        (categories_done - started) * 1000,
+        (users_done - categories_done) * 1000,
+        len(missing_users),
+        (menu_done - users_done) * 1000
+    )
 
 # Authentication endpoints
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_credentials: UserLogin):
     """User login"""
     user = await db.users.find_one({"username": user_credentials.username})
-    if not user or not verify_password(user_credentials.password, user["password_hash"]):
+    if not user or not await verify_password_async(user_credentials.password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -394,7 +1055,8 @@ async def login(user_credentials: UserLogin):
             detail="User account is disabled"
         )
     
-    access_token = create_access_token(data={"user_id": user["id"], "role": user["role"]})
+    access_token = create_user_access_token(user)
+    token_versions.set(user["id"], user.get("token_version", 0), user["is_active"])
     return Token(
         access_token=access_token,
         token_type="bearer",
@@ -410,51 +1072,59 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 # Category endpoints
 @api_router.get("/categories", response_model=List[Category])
-async def get_categories(current_user: User = Depends(get_current_user)):
+async def get_categories(request: Request, current_user: TokenUser = Depends(get_token_user)):
     """Get all categories"""
-    categories = await db.categories.find({"is_active": True}).sort("sort_order").to_list(1000)
-    return [Category(**cat) for cat in categories]
+    snapshot = await menu_snapshot.get()
+    return conditional_response(request, snapshot, "categories", snapshot.active_categories)
 
 @api_router.get("/categories/all", response_model=List[Category])
-async def get_all_categories(current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def get_all_categories(request: Request, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Get all categories including inactive ones (admin only)"""
-    categories = await db.categories.find().sort("sort_order").to_list(1000)
-    return [Category(**cat) for cat in categories]
+    snapshot = await menu_snapshot.get()
+    return conditional_response(request, snapshot, "categories-all", snapshot.categories)
 
 @api_router.post("/categories", response_model=Category)
-async def create_category(category_data: CategoryCreate, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def create_category(category_data: CategoryCreate, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Create new category (admin only)"""
-    # Check if category name already exists
-    existing_cat = await db.categories.find_one({"name": category_data.name})
-    if existing_cat:
+    category = Category(**category_data.dict(), version=await next_menu_version())
+    try:
+        await db.categories.insert_one(category.dict())
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Category name already exists")
-    
-    category = Category(**category_data.dict())
-    await db.categories.insert_one(category.dict())
+    menu_snapshot.invalidate()
     return category
 
 @api_router.put("/categories/{category_id}", response_model=Category)
-async def update_category(category_id: str, category_data: CategoryUpdate, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def update_category(category_id: str, category_data: CategoryUpdate, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Update category (admin only)"""
-    category = await db.categories.find_one({"id": category_id})
-    if not category:
-        raise HTTPException(status_code=404, detail="Category not found")
-    
-    # Check if new name already exists (if name is being updated)
-    if category_data.name and category_data.name != category["name"]:
-        existing_cat = await db.categories.find_one({"name": category_data.name})
-        if existing_cat:
-            raise HTTPException(status_code=400, detail="Category name already exists")
-    
     update_data = {k: v for k, v in category_data.dict().items() if v is not None}
     if update_data:
-        await db.categories.update_one({"id": category_id}, {"$set": update_data})
+        update_data["version"] = await next_menu_version()
+        update_data["updated_at"] = datetime.utcnow()
+        try:
+            updated_category = await db.categories.find_one_and_update(
+                {"id": category_id},
+                {"$set": update_data},
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            raise HTTPException(status_code=400, detail="Category name already exists")
+        if updated_category and CATEGORY_ITEM_FIELDS.keys() & update_data.keys():
+            # Same version on the items, so /menu/changes re-sends them with the new category fields
+            await db.menu_items.update_many(
+                {"category_id": category_id},
+                {"$set": {**category_fields(updated_category), "version": update_data["version"]}}
+            )
+        menu_snapshot.invalidate()
+    else:
+        updated_category = await db.categories.find_one({"id": category_id})
     
-    updated_category = await db.categories.find_one({"id": category_id})
+    if not updated_category:
+        raise HTTPException(status_code=404, detail="Category not found")
     return Category(**updated_category)
 
 @api_router.delete("/categories/{category_id}")
-async def delete_category(category_id: str, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def delete_category(category_id: str, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Delete category (admin only)"""
     # Check if category has associated menu items
     menu_items_count = await db.menu_items.count_documents({"category_id": category_id})
@@ -464,184 +1134,850 @@ async def delete_category(category_id: str, current_user: User = Depends(require
     result = await db.categories.delete_one({"id": category_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
+    await record_menu_tombstone("category", category_id, await next_menu_version())
+    menu_snapshot.invalidate()
     return {"message": "Category deleted successfully"}
 
 # User Management endpoints
+# Projection returning exactly the UserResponse fields
+USER_RESPONSE_PROJECTION = {
+    "_id": 0, "id": 1, "username": 1, "role": 1, "full_name": 1, "email": 1,
+    "phone": 1, "is_active": 1, "created_at": 1, "updated_at": 1
+}
+
+def user_response(user: dict) -> dict:
+    """Fill in the optional UserResponse fields that older user documents may lack"""
+    user.setdefault("email", None)
+    user.setdefault("phone", None)
+    # Handle missing updated_at field for backward compatibility
+    if "updated_at" not in user:
+        user["updated_at"] = user.get("created_at", datetime.utcnow())
+    return user
+
 @api_router.get("/users", response_model=List[UserResponse])
-async def get_users(current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def get_users(current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Get all users (admin only)"""
-    users = await db.users.find().sort("created_at", -1).to_list(1000)
-    
-    # Handle missing updated_at field for backward compatibility
-    result = []
-    for user in users:
-        if "updated_at" not in user:
-            user["updated_at"] = user.get("created_at", datetime.utcnow())
-        result.append(UserResponse(**user))
-    
-    return result
+    users = await db.users.find({}, USER_RESPONSE_PROJECTION).sort("created_at", -1).to_list(1000)
+    return ORJSONResponse([user_response(user) for user in users])
 
 @api_router.post("/users", response_model=UserResponse)
-async def create_user(user_data: UserCreate, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def create_user(user_data: UserCreate, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Create new user (admin only)"""
-    existing_user = await db.users.find_one({"username": user_data.username})
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already exists")
-    
     user = User(
         username=user_data.username,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await get_password_hash_async(user_data.password),
         role=user_data.role,
         full_name=user_data.full_name,
         email=user_data.email,
         phone=user_data.phone
     )
     
-    await db.users.insert_one(user.dict())
+    try:
+        await db.users.insert_one(user.dict())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Username already exists")
+    user_cache.invalidate(user.id)
+    token_versions.set(user.id, user.token_version, user.is_active)
     return UserResponse(**user.dict())
 
 @api_router.get("/users/{user_id}", response_model=UserResponse)
-async def get_user(user_id: str, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def get_user(user_id: str, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Get specific user (admin only)"""
-    user = await db.users.find_one({"id": user_id})
+    user = await db.users.find_one({"id": user_id}, USER_RESPONSE_PROJECTION)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return UserResponse(**user)
+    return ORJSONResponse(user_response(user))
 
 @api_router.put("/users/{user_id}", response_model=UserResponse)
-async def update_user(user_id: str, user_data: UserUpdate, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def update_user(user_id: str, user_data: UserUpdate, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Update user (admin only)"""
-    user = await db.users.find_one({"id": user_id})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Check if new username already exists (if username is being updated)
-    if user_data.username and user_data.username != user["username"]:
-        existing_user = await db.users.find_one({"username": user_data.username})
-        if existing_user:
-            raise HTTPException(status_code=400, detail="Username already exists")
-    
     update_data = {k: v for k, v in user_data.dict().items() if v is not None}
     
     # Hash password if provided
     if user_data.password:
-        update_data["password_hash"] = get_password_hash(user_data.password)
+        update_data["password_hash"] = await get_password_hash_async(user_data.password)
         del update_data["password"]
     
     if update_data:
         update_data["updated_at"] = datetime.utcnow()
-        await db.users.update_one({"id": user_id}, {"$set": update_data})
+        # Pipeline update so values are compared with the stored ones in the same round trip;
+        # $literal keeps values such as bcrypt hashes ("$2b$...") from being read as field paths
+        new_fields = {field: {"$literal": value} for field, value in update_data.items()}
+        # Changing identity or credentials revokes previously issued tokens
+        claim_changes = [
+            {"$ne": [f"${field}", {"$literal": update_data[field]}]}
+            for field in TOKEN_CLAIM_FIELDS if field in update_data
+        ]
+        if claim_changes:
+            token_version = {"$ifNull": ["$token_version", 0]}
+            new_fields["token_version"] = {"$cond": [{"$or": claim_changes}, {"$add": [token_version, 1]}, token_version]}
+        try:
+            updated_user = await db.users.find_one_and_update(
+                {"id": user_id},
+                [{"$set": new_fields}],
+                projection={**USER_RESPONSE_PROJECTION, "token_version": 1},
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            raise HTTPException(status_code=400, detail="Username already exists")
+        user_cache.invalidate(user_id)
+    else:
+        updated_user = await db.users.find_one({"id": user_id}, {**USER_RESPONSE_PROJECTION, "token_version": 1})
     
-    updated_user = await db.users.find_one({"id": user_id})
-    return UserResponse(**updated_user)
+    if not updated_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    token_versions.set(user_id, updated_user.pop("token_version", 0), updated_user["is_active"])
+    return ORJSONResponse(user_response(updated_user))
+
+@api_router.post("/users/{user_id}/revoke-tokens")
+async def revoke_user_tokens(user_id: str, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
+    """Revoke all tokens issued for a user (admin only)"""
+    result = await db.users.update_one(
+        {"id": user_id},
+        {"$inc": {"token_version": 1}, "$set": {"updated_at": datetime.utcnow()}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "token_version": 1, "is_active": 1})
+    token_versions.set(user_id, user["token_version"], user.get("is_active", True))
+    user_cache.invalidate(user_id)
+    return {"message": "User tokens revoked successfully"}
 
 @api_router.delete("/users/{user_id}")
-async def delete_user(user_id: str, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def delete_user(user_id: str, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Delete user (admin only)"""
     if user_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
     
     result = await db.users.delete_one({"id": user_id})
+    user_cache.invalidate(user_id)
+    token_versions.remove(user_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User deleted successfully"}
 
+@api_router.get("/admin/indexes")
+async def get_index_report(current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
+    """Report declared vs existing database indexes (admin only)"""
+    return await index_report()
+
+@api_router.get("/admin/cache-stats")
+async def get_cache_stats(current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
+    """Get in-process cache statistics (admin only)"""
+    return {
+        "user_cache": user_cache.stats(),
+        "recent_idempotency_keys": recent_idempotency_keys.stats(),
+        "password_hash_pool": password_hash_pool.stats(),
+        "menu_snapshot": menu_snapshot.stats(),
+        "menu_search": menu_search.stats(),
+        "menu_availability_hub": menu_availability_hub.stats(),
+        "station_queue_hub": station_queue_hub.stats(),
+        "menu_image_pool": menu_image_pool.stats(),
+        "public_menu": public_menu.stats(),
+        "public_menu_rate_limiter": public_menu_rate_limiter.stats()
+    }
+
+# Menu versioning: every menu/category write is stamped with the next menu version
+async def next_menu_version() -> int:
+    counter = await db.counters.find_one_and_update(
+        {"_id": "menu_version"},
+        {"$inc": {"value": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["value"]
+
+async def current_menu_version() -> int:
+    counter = await db.counters.find_one({"_id": "menu_version"})
+    return counter["value"] if counter else 0
+
+async def menu_tombstone_horizon() -> int:
+    """Highest version of a dropped tombstone; changes since anything older cannot be listed"""
+    counter = await db.counters.find_one({"_id": "menu_tombstone_horizon"})
+    return counter["value"] if counter else 0
+
+async def prune_menu_tombstones():
+    """Drop tombstones older than MENU_TOMBSTONE_TTL_SECONDS, raising the horizon first"""
+    cutoff = datetime.utcnow() - timedelta(seconds=MENU_TOMBSTONE_TTL_SECONDS)
+    expired = await db.menu_tombstones.find({"deleted_at": {"$lt": cutoff}}, {"_id": 0, "version": 1}).to_list(None)
+    if not expired:
+        return
+    horizon = max(tombstone["version"] for tombstone in expired)
+    # Raised before the delete, so a reader that misses a tombstone always sees the new horizon
+    await db.counters.update_one({"_id": "menu_tombstone_horizon"}, {"$max": {"value": horizon}}, upsert=True)
+    await db.menu_tombstones.delete_many({"version": {"$lte": horizon}})
+
+async def record_menu_tombstone(kind: str, object_id: str, version: int):
+    """Remember a deletion so /menu/changes can report it"""
+    await db.menu_tombstones.insert_one({
+        "kind": kind,
+        "id": object_id,
+        "version": version,
+        "deleted_at": datetime.utcnow()
+    })
+    await prune_menu_tombstones()
+
 # Menu endpoints
+# Category fields copied onto every menu item (category field -> menu item field)
+CATEGORY_ITEM_FIELDS = {
+    "name": "category_name",
+    "display_name": "category_display_name",
+    "emoji": "category_emoji",
+    "sort_order": "category_sort_order",
+    "is_active": "category_is_active",
+}
+
+# Order of /menu and /menu/all, also used as the keyset of their pages
+MENU_ITEM_SORT = [("category_sort_order", 1), ("category_id", 1), ("name", 1), ("id", 1)]
+
+def category_fields(category: dict) -> dict:
+    """Menu item fields denormalized from a category; update_category keeps them in sync"""
+    category = category_document(category)
+    return {item_field: category[field] for field, item_field in CATEGORY_ITEM_FIELDS.items()}
+
+async def migrate_menu_item_category_fields() -> int:
+    """Copy category fields onto every menu item (one update_many per category); returns items changed"""
+    categories = await db.categories.find({}, {"_id": 0}).to_list(None)
+    if not categories:
+        return 0
+    result = await db.menu_items.bulk_write([
+        UpdateMany({"category_id": cat["id"]}, {"$set": category_fields(cat)})
+        for cat in categories
+    ], ordered=False)
+    return result.modified_count
+
+def menu_item_with_category(item: dict) -> dict:
+    """Shape a stored menu item like MenuItemWithCategory"""
+    return {
+        "id": item["id"],
+        "name": item["name"],
+        "description": item["description"],
+        "price": item["price"],
+        "category_id": item["category_id"],
+        "category_name": item["category_name"],
+        "category_display_name": item["category_display_name"],
+        "category_emoji": item["category_emoji"],
+        "item_type": item["item_type"],
+        "available": item["available"],
+        "on_stop_list": item["on_stop_list"],
+        "bottle_available": item.get("bottle_available", False),
+        "bottle_price": item.get("bottle_price"),
+        "image_url": item.get("image_url"),
+        "images": item.get("images"),
+        "created_at": item["created_at"],
+        "updated_at": item["updated_at"]
+    }
+
+def category_document(category: dict) -> dict:
+    """Normalize a stored category through the Category model"""
+    # Categories created before updated_at existed fall back to created_at, so the
+    # result (and the snapshot digest) does not change on every call
+    if "updated_at" not in category and "created_at" in category:
+        category = {**category, "updated_at": category["created_at"]}
+    return Category(**category).dict()
+
+class MenuSnapshot:
+    """Read-only view of the whole menu, with the per-endpoint views precomputed"""
+
+    def __init__(self, version: int, menu_items: list, categories: list, menu_version: int = 0):
+        self.version = version
+        # Shared menu version the data is at least as new as; clients pass it to /menu/changes
+        self.menu_version = menu_version
+        self.built_at = time.monotonic()
+        self.checked_at = self.built_at
+        # Normalized once here so category endpoints can return them as-is
+        self.categories = [category_document(cat) for cat in categories]
+        self.active_categories = [cat for cat in self.categories if cat["is_active"]]
+        
+        # All views keep the MENU_ITEM_SORT order of menu_items
+        self.all_items = []
+        self.menu = []
+        self.by_category = {}
+        self.by_type = {}
+        for stored in menu_items:
+            # Items whose category no longer exists carry no category fields
+            if "category_name" not in stored:
+                continue
+            item = menu_item_with_category(stored)
+            self.all_items.append(item)
+            if not stored.get("category_is_active", True):
+                continue
+            self.menu.append(item)
+            if item["available"] and not item["on_stop_list"]:
+                self.by_category.setdefault(item["category_id"], []).append(item)
+                self.by_type.setdefault(item["item_type"], []).append(item)
+        self.items_by_id = {item["id"]: item for item in self.all_items}
+        # Content fingerprint, identical across workers holding the same menu
+        self.digest = hashlib.sha1(repr((self.all_items, self.categories)).encode()).hexdigest()[:20]
+        self._encoded = {}
+        self._stats = None
+
+    def stats(self) -> dict:
+        """Admin menu statistics, computed once per snapshot"""
+        if self._stats is None:
+            counts = {}
+            available_items = 0
+            for item in self.all_items:
+                counts[item["category_id"]] = counts.get(item["category_id"], 0) + 1
+                if item["available"]:
+                    available_items += 1
+            self._stats = {
+                "total_items": len(self.all_items),
+                "available_items": available_items,
+                "hidden_items": len(self.all_items) - available_items,
+                "by_category": [
+                    {"_id": cat["id"], "category_name": cat["display_name"], "count": counts[cat["id"]]}
+                    for cat in self.categories if cat["id"] in counts
+                ]
+            }
+        return self._stats
+
+    def encoded(self, view: str, content) -> bytes:
+        """JSON body of one view, encoded once per snapshot and reused by every request"""
+        body = self._encoded.get(view)
+        if body is None:
+            body = self._encoded[view] = orjson.dumps(content)
+        return body
+
+    def etag(self, view: str) -> str:
+        """Strong ETag for one representation of this snapshot"""
+        return f'"{view}-{self.digest}"'
+
+class MenuSnapshotStore:
+    """Holds the current MenuSnapshot and rebuilds it lazily after invalidation.
+
+    Every menu/category write path calls invalidate(). Writes made by other workers
+    are picked up by comparing the snapshot's menu_version with current_menu_version(),
+    at most once per check_seconds. A snapshot is also rebuilt after max_age_seconds,
+    which covers a write that took its version before the build but landed after it.
+    """
+
+    def __init__(self, check_seconds: float, max_age_seconds: float):
+        self.check_seconds = check_seconds
+        self.max_age_seconds = max_age_seconds
+        self.version = 0
+        self._snapshot = None
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.version_checks = 0
+        # Called after every invalidate(), e.g. to re-render the public menu
+        self.listeners = []
+
+    async def _is_current(self, snapshot) -> bool:
+        if snapshot is None or snapshot.version != self.version:
+            return False
+        now = time.monotonic()
+        if now - snapshot.built_at >= self.max_age_seconds:
+            return False
+        if now - snapshot.checked_at < self.check_seconds:
+            return True
+        # Claimed before awaiting so concurrent requests don't all run the check
+        snapshot.checked_at = now
+        self.version_checks += 1
+        if await current_menu_version() == snapshot.menu_version:
+            return True
+        # Another worker wrote: later requests wait for the rebuild instead of reusing this one
+        if self._snapshot is snapshot:
+            self._snapshot = None
+        return False
+
+    def invalidate(self):
+        self.version += 1
+        self._snapshot = None
+        for listener in self.listeners:
+            listener()
+
+    async def get(self) -> MenuSnapshot:
+        snapshot = self._snapshot
+        if await self._is_current(snapshot):
+            self.hits += 1
+            return snapshot
+        async with self._lock:
+            # Another request may have rebuilt it while we waited
+            if self._snapshot is not snapshot and await self._is_current(self._snapshot):
+                self.hits += 1
+                return self._snapshot
+            version = self.version
+            # Read before the data so changes racing the build are re-sent by /menu/changes
+            menu_version = await current_menu_version()
+            menu_items = await db.menu_items.find({}, {"_id": 0}).sort(MENU_ITEM_SORT).to_list(None)
+            categories = await db.categories.find({}, {"_id": 0}).sort("sort_order").to_list(None)
+            snapshot = MenuSnapshot(version, menu_items, categories, menu_version)
+            self.builds += 1
+            # A write that landed during the build invalidated it already; don't publish it
+            if version == self.version:
+                self._snapshot = snapshot
+            return snapshot
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": self.version,
+            "check_seconds": self.check_seconds,
+            "max_age_seconds": self.max_age_seconds,
+            "hits": self.hits,
+            "builds": self.builds,
+            "version_checks": self.version_checks,
+            "items": len(snapshot.all_items) if snapshot else None,
+            "age_seconds": round(time.monotonic() - snapshot.built_at, 3) if snapshot else None,
+        }
+
+menu_snapshot = MenuSnapshotStore(check_seconds=MENU_SNAPSHOT_CHECK_SECONDS, max_age_seconds=MENU_SNAPSHOT_MAX_AGE_SECONDS)
+
+SEARCH_TOKEN_RE = re.compile(r"\w+")
+
+def fold_search_text(text: str) -> str:
+    """Case-fold Cyrillic and Latin text for search; ё is matched as е"""
+    return text.casefold().replace("ё", "е")
+
+# Longest word prefix with its own posting list; longer query words are looked up by
+# this prefix and confirmed against the item text
+SEARCH_MAX_PREFIX = 10
+
+class MenuSearchIndex:
+    """In-memory word-prefix index over menu item names and descriptions.
+
+    Every item has a static sort key, (folded name, id). Each word prefix maps to the
+    keys of the items that have a word starting with it, kept sorted by that key:
+    one set of posting lists for names, one for names and descriptions. A search
+    walks them lazily in key order, tier by tier, and stops after `limit` hits, so
+    its cost follows `limit` rather than the number of matching items.
+
+    Synced from the menu snapshot: only items whose name or description changed since
+    the previous snapshot are re-indexed.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._documents = {}   # item id -> (sort key, folded name, folded description)
+        self._keys = []        # every sort key, sorted, for whole-name prefix matches
+        self._name_postings = defaultdict(list)  # word prefix -> sorted keys, name words
+        self._all_postings = defaultdict(list)   # word prefix -> sorted keys, name and description words
+        self._lock = asyncio.Lock()
+        self.syncs = 0
+        self.reindexed = 0
+
+    @staticmethod
+    def _prefixes(text: str) -> set:
+        return {
+            word[:length]
+            for word in SEARCH_TOKEN_RE.findall(text)
+            for length in range(1, min(len(word), SEARCH_MAX_PREFIX) + 1)
+        }
+
+    def _postings_of(self, name: str, description: str) -> list:
+        name_prefixes = self._prefixes(name)
+        all_prefixes = name_prefixes | self._prefixes(description)
+        return (
+            [self._name_postings[prefix] for prefix in name_prefixes]
+            + [self._all_postings[prefix] for prefix in all_prefixes]
+        )
+
+    def _add(self, item_id: str, name: str, description: str, touched: Optional[dict]):
+        """Index one item; with `touched`, keys are appended and the caller sorts those lists once"""
+        key = (name, item_id)
+        self._documents[item_id] = (key, name, description)
+        for postings in [self._keys] + self._postings_of(name, description):
+            if touched is None:
+                bisect.insort(postings, key)
+            else:
+                postings.append(key)
+                touched[id(postings)] = postings
+
+    def _remove(self, item_id: str):
+        key, name, description = self._documents.pop(item_id)
+        for postings in [self._keys] + self._postings_of(name, description):
+            position = bisect.bisect_left(postings, key)
+            if position < len(postings) and postings[position] == key:
+                del postings[position]
+        for index in (self._name_postings, self._all_postings):
+            for prefix in [prefix for prefix in self._prefixes(f"{name} {description}") if not index.get(prefix, True)]:
+                del index[prefix]
+
+    def sync(self, snapshot: MenuSnapshot):
+        """Bring the index in line with a snapshot, touching only changed items"""
+        if snapshot is self._snapshot:
+            return
+        current = {
+            item["id"]: (fold_search_text(item["name"]), fold_search_text(item["description"] or ""))
+            for item in snapshot.menu
+        }
+        stale = [
+            item_id for item_id, document in self._documents.items()
+            if current.get(item_id) != document[1:]
+        ]
+        for item_id in stale:
+            self._remove(item_id)
+        added = [item_id for item_id in current if item_id not in self._documents]
+        # Many additions (the first build, an import) are appended and sorted once per list
+        touched = {} if len(added) > 64 else None
+        for item_id in added:
+            self._add(item_id, *current[item_id], touched)
+        for postings in (touched or {}).values():
+            postings.sort()
+        self.reindexed += len(added)
+        self._snapshot = snapshot
+        self.syncs += 1
+
+    def _name_prefix_matches(self, folded_query: str):
+        """Keys of items whose whole name starts with the query, in key order"""
+        position = bisect.bisect_left(self._keys, (folded_query,))
+        while position < len(self._keys) and self._keys[position][0].startswith(folded_query):
+            yield self._keys[position]
+            position += 1
+
+    def _word_prefix_matches(self, postings: dict, tokens: list, in_description: bool):
+        """Keys of items with a word starting with every token, in key order.
+
+        Leapfrogs through the posting lists with bisect, so runs of non-matching keys
+        are skipped rather than visited.
+        """
+        lists = []
+        for token in tokens:
+            keys = postings.get(token[:SEARCH_MAX_PREFIX])
+            if not keys:
+                return
+            lists.append(keys)
+        lists.sort(key=len)
+        driver, others = lists[0], lists[1:]
+        long_tokens = [token for token in tokens if len(token) > SEARCH_MAX_PREFIX]
+        position = 0
+        while position < len(driver):
+            key = driver[position]
+            for keys in others:
+                other = bisect.bisect_left(keys, key)
+                if other == len(keys):
+                    return
+                if keys[other] != key:
+                    # No item between the two keys can match; jump ahead
+                    position = bisect.bisect_left(driver, keys[other], position + 1)
+                    break
+            else:
+                position += 1
+                if long_tokens:
+                    _, name, description = self._documents[key[1]]
+                    words = SEARCH_TOKEN_RE.findall(f"{name} {description}" if in_description else name)
+                    if not all(any(word.startswith(token) for word in words) for token in long_tokens):
+                        continue
+                yield key
+
+    def search(self, query: str, limit: int) -> list:
+        """Item ids with a word starting with every query word.
+
+        Best matches first: whole name starts with the query, then every word found
+        in the name, then words found in the description; by name within each tier.
+        """
+        folded_query = fold_search_text(query).strip()
+        tokens = list(dict.fromkeys(SEARCH_TOKEN_RE.findall(folded_query)))
+        if not tokens:
+            return []
+        results = []
+        seen = set()
+        tiers = (
+            self._name_prefix_matches(folded_query),
+            self._word_prefix_matches(self._name_postings, tokens, False),
+            self._word_prefix_matches(self._all_postings, tokens, True),
+        )
+        for keys in tiers:
+            for _, item_id in keys:
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+                results.append(item_id)
+                if len(results) == limit:
+                    return results
+        return results
+
+    async def query(self, snapshot: MenuSnapshot, query: str, limit: int) -> list:
+        """Search against a snapshot, syncing the index to it first if needed"""
+        async with self._lock:
+            if snapshot is not self._snapshot:
+                # Indexing a large catalog takes a while; keep it off the event loop
+                await asyncio.to_thread(self.sync, snapshot)
+            return self.search(query, limit)
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._documents),
+            "prefixes": len(self._all_postings),
+            "syncs": self.syncs,
+            "reindexed": self.reindexed,
+        }
+
+menu_search = MenuSearchIndex()
+
+# Fields pushed to connected clients as soon as a write commits
+AVAILABILITY_FIELDS = ("available", "on_stop_list")
+AVAILABILITY_PROJECTION = {"_id": 0, "id": 1, **{field: 1 for field in AVAILABILITY_FIELDS}}
+
+class MenuAvailabilityHub:
+    """WebSocket connections of this worker that receive menu availability diffs.
+
+    A watcher task polls current_menu_version(), woken right away by this worker's
+    own menu writes, so writes made on any worker reach every connection. When the
+    version moves it reads the items changed since (the /menu/changes query) and
+    broadcasts those whose available / on_stop_list differ from the last state it
+    saw. Items stamped with a version that committed late are covered by re-reading
+    the window for settle_seconds. Clients slower than send_timeout are disconnected
+    and resync with /menu/changes when they reconnect.
+    """
+
+    def __init__(self, poll_seconds: float, settle_seconds: float, send_timeout: float):
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.send_timeout = send_timeout
+        self.connections = set()
+        self.version = 0
+        self._state = {}  # item id -> (available, on_stop_list) last seen
+        self._window_start = None
+        self._changed_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._watcher = None
+        self.published = 0
+        self.dropped = 0
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        self.connections.add(websocket)
+
+    def disconnect(self, websocket: WebSocket):
+        self.connections.discard(websocket)
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def start(self):
+        # Version first, so writes racing the state load are read again by the watcher
+        self.version = await current_menu_version()
+        self._state = {
+            item["id"]: tuple(item.get(field) for field in AVAILABILITY_FIELDS)
+            async for item in db.menu_items.find({}, AVAILABILITY_PROJECTION)
+        }
+        self._window_start = max(self.version - MENU_CHANGES_OVERLAP_VERSIONS, 0)
+        self._changed_at = time.monotonic()
+        self._watcher = asyncio.get_running_loop().create_task(self._watch())
+
+    def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+
+    async def _watch(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Failed to read menu availability changes")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def poll(self):
+        """Broadcast availability changes committed since the last poll"""
+        version = await current_menu_version()
+        now = time.monotonic()
+        if version != self.version:
+            if self._window_start is None:
+                self._window_start = max(self.version - MENU_CHANGES_OVERLAP_VERSIONS, 0)
+            self.version = version
+            self._changed_at = now
+        if self._window_start is None:
+            return
+        
+        items = []
+        changed_since = {"version": {"$gt": self._window_start}}
+        async for item in db.menu_items.find(changed_since, AVAILABILITY_PROJECTION):
+            state = tuple(item.get(field) for field in AVAILABILITY_FIELDS)
+            if self._state.get(item["id"]) != state:
+                self._state[item["id"]] = state
+                items.append({"id": item["id"], **dict(zip(AVAILABILITY_FIELDS, state))})
+        if now - self._changed_at >= self.settle_seconds:
+            self._window_start = None
+        
+        if items and self.connections:
+            self.published += 1
+            await self._broadcast(orjson.dumps({"type": "availability", "version": version, "items": items}).decode())
+
+    async def _send(self, websocket: WebSocket, message: str) -> bool:
+        try:
+            await asyncio.wait_for(websocket.send_text(message), self.send_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _broadcast(self, message: str):
+        connections = list(self.connections)
+        sent = await asyncio.gather(*(self._send(ws, message) for ws in connections))
+        for websocket, ok in zip(connections, sent):
+            if not ok and websocket in self.connections:
+                self.disconnect(websocket)
+                self.dropped += 1
+                try:
+                    await asyncio.wait_for(websocket.close(), self.send_timeout)
+                except Exception:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.connections),
+            "version": self.version,
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+menu_availability_hub = MenuAvailabilityHub(
+    MENU_AVAILABILITY_POLL_SECONDS, MENU_AVAILABILITY_SETTLE_SECONDS, MENU_BROADCAST_SEND_TIMEOUT_SECONDS
+)
+# Every local menu write invalidates the snapshot; check for availability changes right away
+menu_snapshot.listeners.append(menu_availability_hub.wake)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def conditional_response(request: Request, snapshot: MenuSnapshot, view: str, content) -> Response:
+    """Answer with 304 when the client already has this representation of the snapshot"""
+    etag = snapshot.etag(view)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "X-Menu-Version": str(snapshot.menu_version)}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=snapshot.encoded(view, content), media_type="application/json", headers=headers)
+
+def encode_menu_cursor(key: tuple) -> str:
+    """Opaque page cursor for a (category sort_order, category id, item name, item id) key"""
+    return base64.urlsafe_b64encode(orjson.dumps(list(key))).decode("ascii").rstrip("=")
+
+def decode_menu_cursor(cursor: str) -> tuple:
+    try:
+        key = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        sort_order, category_id, name, item_id = key
+        if not isinstance(sort_order, int) or not all(isinstance(v, str) for v in (category_id, name, item_id)):
+            raise ValueError(key)
+    except (ValueError, TypeError, orjson.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_order, category_id, name, item_id
+
+# Index walked by menu pages and streams, with a sort equal to its key pattern. Active-only
+# pages lead with category_is_active: the filter pins it to True, so the order is still
+# MENU_ITEM_SORT, and min() bounds do not make it an equality prefix the planner could skip
+MENU_ITEM_SORT_INDEX = {
+    True: ("category_is_active_1_category_sort_order_1_category_id_1_name_1_id_1",
+           [("category_is_active", 1)] + MENU_ITEM_SORT),
+    False: ("category_sort_order_1_category_id_1_name_1_id_1", MENU_ITEM_SORT),
+}
+
+def menu_items_query(active_categories_only: bool,
+                     after: Optional[tuple] = None) -> Tuple[dict, list, str, Optional[list]]:
+    """Filter, sort, index hint and min() bound for /menu (active categories) or /menu/all.
+
+    A page behind a MENU_ITEM_SORT key starts the index scan at that key with min()
+    (inclusive, so the caller skips the key's own item). The sort is the index's own
+    key pattern, so that is one index scan already in order with no SORT stage,
+    whatever the planner would make of a keyset $or.
+    """
+    query_filter = {"category_is_active": True} if active_categories_only else {}
+    index_name, sort = MENU_ITEM_SORT_INDEX[active_categories_only]
+    if after is None:
+        return query_filter, sort, index_name, None
+    key = ([True] if active_categories_only else []) + list(after)
+    return query_filter, sort, index_name, [(field, value) for (field, _), value in zip(sort, key)]
+
+async def iter_menu_items(active_categories_only: bool, after: Optional[tuple] = None):
+    """Yield (key, item) for menu items in MENU_ITEM_SORT order, straight from a Motor cursor.
+
+    Memory stays bounded however large the catalog is. `after` resumes behind a previous key.
+    """
+    query_filter, sort, index_name, min_key = menu_items_query(active_categories_only, after)
+    cursor = db.menu_items.find(query_filter, {"_id": 0}).sort(sort).hint(index_name)
+    if min_key is not None:
+        cursor = cursor.min(min_key)
+    async for item in cursor.batch_size(MENU_PAGE_BATCH_SIZE):
+        # Items whose category no longer exists carry no category fields
+        if "category_name" not in item:
+            continue
+        key = (item["category_sort_order"], item["category_id"], item["name"], item["id"])
+        if key == after:
+            continue
+        yield key, menu_item_with_category(item)
+
+async def menu_page(active_categories_only: bool, limit: int, cursor: Optional[str]) -> dict:
+    """One keyset page of menu items plus the cursor for the next page (None on the last one)"""
+    after = decode_menu_cursor(cursor) if cursor else None
+    items = []
+    last_key = None
+    async for key, item in iter_menu_items(active_categories_only, after):
+        if len(items) == limit:
+            return {"items": items, "next_cursor": encode_menu_cursor(last_key)}
+        items.append(item)
+        last_key = key
+    return {"items": items, "next_cursor": None}
+
+def menu_ndjson_response(active_categories_only: bool, cursor: Optional[str]) -> StreamingResponse:
+    """Stream menu items as newline-delimited JSON while the Motor cursors yield them"""
+    after = decode_menu_cursor(cursor) if cursor else None
+
+    async def lines():
+        async for _, item in iter_menu_items(active_categories_only, after):
+            yield orjson.dumps(item) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def menu_listing(request: Request, view: str, active_categories_only: bool, limit: Optional[int], cursor: Optional[str], format: str) -> Response:
+    """Serve a whole-menu endpoint as NDJSON, as one keyset page, or from the snapshot"""
+    if format == "ndjson":
+        return menu_ndjson_response(active_categories_only, cursor)
+    if limit is not None or cursor is not None:
+        return ORJSONResponse(await menu_page(active_categories_only, limit or MENU_PAGE_DEFAULT_LIMIT, cursor))
+    snapshot = await menu_snapshot.get()
+    content = snapshot.menu if active_categories_only else snapshot.all_items
+    return conditional_response(request, snapshot, view, content)
+
 @api_router.get("/menu", response_model=List[MenuItemWithCategory])
-async def get_menu(current_user: User = Depends(get_current_user)):
+async def get_menu(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MENU_PAGE_MAX_LIMIT, description="Page size; returns {items, next_cursor}"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: TokenUser = Depends(get_token_user)
+):
     """Get all menu items with category information (shows unavailable items to waitresses)"""
     # For waitresses, show all items but mark unavailable ones
     # For other roles, show all items
-    pipeline = [
-        {"$lookup": {
-            "from": "categories",
-            "localField": "category_id",
-            "foreignField": "id",
-            "as": "category"
-        }},
-        {"$unwind": "$category"},
-        {"$match": {"category.is_active": True}},
-        {"$sort": {"category.sort_order": 1, "name": 1}}
-    ]
-    
-    menu_items = await db.menu_items.aggregate(pipeline).to_list(1000)
-    
-    result = []
-    for item in menu_items:
-        result.append(MenuItemWithCategory(
-            id=item["id"],
-            name=item["name"],
-            description=item["description"],
-            price=item["price"],
-            category_id=item["category_id"],
-            category_name=item["category"]["name"],
-            category_display_name=item["category"]["display_name"],
-            category_emoji=item["category"]["emoji"],
-            item_type=item["item_type"],
-            available=item["available"],
-            on_stop_list=item["on_stop_list"],
-            bottle_available=item.get("bottle_available", False),
-            bottle_price=item.get("bottle_price"),
-            image_url=item.get("image_url"),
-            created_at=item["created_at"],
-            updated_at=item["updated_at"]
-        ))
-    
-    return result
+    return await menu_listing(request, "menu", True, limit, cursor, format)
 
 @api_router.get("/menu/all", response_model=List[MenuItemWithCategory])
-async def get_all_menu_items(current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def get_all_menu_items(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MENU_PAGE_MAX_LIMIT, description="Page size; returns {items, next_cursor}"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))
+):
     """Get all menu items including unavailable ones (admin only)"""
-    pipeline = [
-        {"$lookup": {
-            "from": "categories",
-            "localField": "category_id",
-            "foreignField": "id",
-            "as": "category"
-        }},
-        {"$unwind": "$category"},
-        {"$sort": {"category.sort_order": 1, "name": 1}}
-    ]
-    
-    menu_items = await db.menu_items.aggregate(pipeline).to_list(1000)
-    
-    result = []
-    for item in menu_items:
-        result.append(MenuItemWithCategory(
-            id=item["id"],
-            name=item["name"],
-            description=item["description"],
-            price=item["price"],
-            category_id=item["category_id"],
-            category_name=item["category"]["name"],
-            category_display_name=item["category"]["display_name"],
-            category_emoji=item["category"]["emoji"],
-            item_type=item["item_type"],
-            available=item["available"],
-            on_stop_list=item["on_stop_list"],
-            bottle_available=item.get("bottle_available", False),
-            bottle_price=item.get("bottle_price"),
-            image_url=item.get("image_url"),
-            created_at=item["created_at"],
-            updated_at=item["updated_at"]
-        ))
-    
-    return result
+    return await menu_listing(request, "menu-all", False, limit, cursor, format)
 
 @api_router.post("/menu", response_model=MenuItem)
-async def create_menu_item(item_data: MenuItemCreate, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def create_menu_item(item_data: MenuItemCreate, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Create new menu item (admin only)"""
     # Verify category exists
     category = await db.categories.find_one({"id": item_data.category_id})
     if not category:
         raise HTTPException(status_code=400, detail="Category not found")
     
-    item = MenuItem(**item_data.dict())
+    item = MenuItem(**item_data.dict(), **category_fields(category), version=await next_menu_version())
     await db.menu_items.insert_one(item.dict())
+    menu_snapshot.invalidate()
     return item
 
 @api_router.put("/menu/{item_id}", response_model=MenuItem)
-async def update_menu_item(item_id: str, item_data: MenuItemUpdate, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def update_menu_item(item_id: str, item_data: MenuItemUpdate, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Update menu item (admin only)"""
     item = await db.menu_items.find_one({"id": item_id})
     if not item:
@@ -654,111 +1990,271 @@ async def update_menu_item(item_id: str, item_data: MenuItemUpdate, current_user
             raise HTTPException(status_code=400, detail="Category not found")
     
     update_data = {k: v for k, v in item_data.dict().items() if v is not None}
+    if item_data.category_id:
+        update_data.update(category_fields(category))
     if update_data:
         update_data["updated_at"] = datetime.utcnow()
+        update_data["version"] = await next_menu_version()
         await db.menu_items.update_one({"id": item_id}, {"$set": update_data})
+        menu_snapshot.invalidate()
     
     updated_item = await db.menu_items.find_one({"id": item_id})
     return MenuItem(**updated_item)
 
+@api_router.post("/menu/bulk", response_model=MenuBulkUpdateResult)
+async def bulk_update_menu_items(bulk_data: MenuBulkUpdate, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
+    """Apply many partial menu item updates in one write (admin only)"""
+    item_ids = {update.id for update in bulk_data.items}
+    category_ids = {update.category_id for update in bulk_data.items if update.category_id}
+    existing_ids = {
+        item["id"] async for item in db.menu_items.find({"id": {"$in": list(item_ids)}}, {"_id": 0, "id": 1})
+    }
+    categories_by_id = {
+        cat["id"]: cat async for cat in db.categories.find({"id": {"$in": list(category_ids)}}, {"_id": 0})
+    } if category_ids else {}
+
+    results = []
+    changes = []
+    seen_ids = set()
+    now = datetime.utcnow()
+    for update in bulk_data.items:
+        if update.id in seen_ids:
+            results.append({"id": update.id, "status": "invalid", "error": "Duplicate item id in request"})
+            continue
+        seen_ids.add(update.id)
+        if update.id not in existing_ids:
+            results.append({"id": update.id, "status": "not_found", "error": "Menu item not found"})
+            continue
+        if update.category_id and update.category_id not in categories_by_id:
+            results.append({"id": update.id, "status": "invalid", "error": "Category not found"})
+            continue
+        update_data = {k: v for k, v in update.dict(exclude={"id"}).items() if v is not None}
+        if update.category_id:
+            update_data.update(category_fields(categories_by_id[update.category_id]))
+        if not update_data:
+            results.append({"id": update.id, "status": "unchanged"})
+            continue
+        update_data["updated_at"] = now
+        changes.append((update.id, update_data))
+        results.append({"id": update.id, "status": "updated"})
+
+    version = None
+    if changes:
+        # One menu version for the whole batch, stamped on every updated item
+        version = await next_menu_version()
+        result = await db.menu_items.bulk_write([
+            UpdateOne({"id": item_id}, {"$set": {**update_data, "version": version}})
+            for item_id, update_data in changes
+        ], ordered=False)
+        if result.matched_count != len(changes):
+            # Some items were deleted between the pre-read and the write
+            changed_ids = [item_id for item_id, _ in changes]
+            remaining_ids = {
+                item["id"] async for item in db.menu_items.find({"id": {"$in": changed_ids}}, {"_id": 0, "id": 1})
+            }
+            changes = [(item_id, update_data) for item_id, update_data in changes if item_id in remaining_ids]
+            for entry in results:
+                if entry["status"] == "updated" and entry["id"] not in remaining_ids:
+                    entry.update({"status": "not_found", "error": "Menu item not found"})
+        menu_snapshot.invalidate()
+
+    return {
+        "version": version,
+        "updated": len(changes),
+        "failed": sum(1 for result in results if result["status"] in ("not_found", "invalid")),
+        "results": results
+    }
+
 @api_router.delete("/menu/{item_id}")
-async def delete_menu_item(item_id: str, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def delete_menu_item(item_id: str, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Delete menu item (admin only)"""
     result = await db.menu_items.delete_one({"id": item_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Menu item not found")
+    await record_menu_tombstone("menu_item", item_id, await next_menu_version())
+    menu_snapshot.invalidate()
     return {"message": "Menu item deleted successfully"}
 
 @api_router.get("/menu/category/{category_id}", response_model=List[MenuItemWithCategory])
-async def get_menu_by_category(category_id: str, current_user: User = Depends(get_current_user)):
+async def get_menu_by_category(category_id: str, current_user: TokenUser = Depends(get_token_user)):
     """Get menu items by category"""
-    pipeline = [
-        {"$match": {"category_id": category_id, "available": True, "on_stop_list": False}},
-        {"$lookup": {
-            "from": "categories",
-            "localField": "category_id",
-            "foreignField": "id",
-            "as": "category"
-        }},
-        {"$unwind": "$category"},
-        {"$match": {"category.is_active": True}},
-        {"$sort": {"name": 1}}
-    ]
-    
-    menu_items = await db.menu_items.aggregate(pipeline).to_list(1000)
-    
-    result = []
-    for item in menu_items:
-        result.append(MenuItemWithCategory(
-            id=item["id"],
-            name=item["name"],
-            description=item["description"],
-            price=item["price"],
-            category_id=item["category_id"],
-            category_name=item["category"]["name"],
-            category_display_name=item["category"]["display_name"],
-            category_emoji=item["category"]["emoji"],
-            item_type=item["item_type"],
-            available=item["available"],
-            on_stop_list=item["on_stop_list"],
-            bottle_available=item.get("bottle_available", False),
-            bottle_price=item.get("bottle_price"),
-            image_url=item.get("image_url"),
-            created_at=item["created_at"],
-            updated_at=item["updated_at"]
-        ))
-    
-    return result
+    snapshot = await menu_snapshot.get()
+    items = snapshot.by_category.get(category_id)
+    if items is None:
+        # Not memoized, so arbitrary category ids cannot grow the snapshot's encoded views
+        return Response(content=b"[]", media_type="application/json")
+    body = snapshot.encoded(f"category:{category_id}", items)
+    return Response(content=body, media_type="application/json")
 
 @api_router.get("/menu/type/{item_type}", response_model=List[MenuItemWithCategory])
-async def get_menu_by_type(item_type: ItemType, current_user: User = Depends(get_current_user)):
+async def get_menu_by_type(item_type: ItemType, current_user: TokenUser = Depends(get_token_user)):
     """Get menu items by type (food/drink)"""
-    pipeline = [
-        {"$match": {"item_type": item_type, "available": True, "on_stop_list": False}},
-        {"$lookup": {
-            "from": "categories",
-            "localField": "category_id",
-            "foreignField": "id",
-            "as": "category"
-        }},
-        {"$unwind": "$category"},
-        {"$match": {"category.is_active": True}},
-        {"$sort": {"category.sort_order": 1, "name": 1}}
-    ]
-    
-    menu_items = await db.menu_items.aggregate(pipeline).to_list(1000)
-    
-    result = []
-    for item in menu_items:
-        result.append(MenuItemWithCategory(
-            id=item["id"],
-            name=item["name"],
-            description=item["description"],
-            price=item["price"],
-            category_id=item["category_id"],
-            category_name=item["category"]["name"],
-            category_display_name=item["category"]["display_name"],
-            category_emoji=item["category"]["emoji"],
-            item_type=item["item_type"],
-            available=item["available"],
-            on_stop_list=item["on_stop_list"],
-            bottle_available=item.get("bottle_available", False),
-            bottle_price=item.get("bottle_price"),
-            image_url=item.get("image_url"),
-            created_at=item["created_at"],
-            updated_at=item["updated_at"]
-        ))
+    snapshot = await menu_snapshot.get()
+    body = snapshot.encoded(f"type:{item_type.value}", snapshot.by_type.get(item_type.value, []))
+    return Response(content=body, media_type="application/json")
+
+@api_router.get("/menu/search")
+async def search_menu(
+    q: str = Query(..., min_length=1, max_length=100, description="Words to find in item names and descriptions"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Search menu items by name and description for quick item entry"""
+    snapshot = await menu_snapshot.get()
+    item_ids = await menu_search.query(snapshot, q, limit)
+    return ORJSONResponse([snapshot.items_by_id[item_id] for item_id in item_ids])
+
+@api_router.get("/menu/changes")
+async def get_menu_changes(
+    since: int = Query(..., ge=0, description="Menu version the client already has (X-Menu-Version of /menu)"),
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Get menu items and categories created, updated, deleted or stop-listed since a menu version.
+
+    Deletions are only kept for MENU_TOMBSTONE_TTL_SECONDS. When one newer than `since`
+    has already been dropped, the response has `resync: true` and no changes; the client
+    must reload /menu and continue from its X-Menu-Version.
+    """
+    version = await current_menu_version()
+    # A write can be stamped with a version before an earlier-stamped write commits, so a
+    # few versions before `since` are re-sent; clients apply changes idempotently by id
+    changed_since = {"version": {"$gt": max(since - MENU_CHANGES_OVERLAP_VERSIONS, 0)}}
+    
+    tombstones = await db.menu_tombstones.find(changed_since, {"_id": 0, "deleted_at": 0}).sort("version", 1).to_list(None)
+    # Read after the tombstones: pruning raises the horizon before it deletes
+    if since < await menu_tombstone_horizon():
+        return ORJSONResponse({
+            "since": since, "version": version, "resync": True, "items": [], "categories": [], "tombstones": []
+        })
+    items = await db.menu_items.find(changed_since, {"_id": 0}).sort("version", 1).to_list(None)
+    categories = await db.categories.find(changed_since, {"_id": 0}).sort("version", 1).to_list(None)
+    
+    return ORJSONResponse({
+        "since": since,
+        "version": version,
+        "resync": False,
+        "items": [{**menu_item_with_category(item), "version": item["version"]} for item in items if "category_name" in item],
+        "categories": [category_document(cat) for cat in categories],
+        "tombstones": tombstones
+    })
+
+@api_router.websocket("/ws/menu")
+async def menu_availability_socket(websocket: WebSocket, token: str = Query(...)):
+    """Push {type: availability, version, items: [{id, available, on_stop_list}]} diffs.
+
+    Browsers cannot set headers on WebSocket requests, so the access token is passed
+    as the `token` query parameter. The first message carries the current menu
+    version; clients that reconnect catch up with /menu/changes?since=<version>.
+    """
+    try:
+        await token_user_from_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     
-    return result
+    await menu_availability_hub.connect(websocket)
+    try:
+        await websocket.send_text(orjson.dumps({"type": "hello", "version": await current_menu_version()}).decode())
+        while True:
+            # Clients may send "ping" to keep idle proxies from closing the connection
+            if await websocket.receive_text() == "ping":
+                await websocket.send_text('{"type":"pong"}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        menu_availability_hub.disconnect(websocket)
 
 # Order endpoints
+# Statuses shown on the kitchen and bar queues
+ACTIVE_ORDER_STATUSES = ["pending", "confirmed", "preparing"]
+
+# Order flag set by create_order for each station's item type
+STATION_ORDER_FLAGS = {"food": "has_food_items", "drink": "has_drink_items"}
+
+# The waitress interface orders a drink by the bottle as "<menu item id>_bottle"
+BOTTLE_ITEM_SUFFIX = "_bottle"
+
+def base_item_id(menu_item_id: str) -> str:
+    """Menu item id of an order line (strips the bottle suffix)"""
+    return menu_item_id[:-len(BOTTLE_ITEM_SUFFIX)] if menu_item_id.endswith(BOTTLE_ITEM_SUFFIX) else menu_item_id
+
+# Menu item fields create_order needs to resolve line items
+ORDER_MENU_ITEM_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "item_type": 1, "available": 1, "on_stop_list": 1, "bottle_available": 1
+}
+
+def order_request_hash(order_data: SimpleOrderCreate) -> str:
+    return hashlib.sha256(orjson.dumps(order_data.dict(), option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+async def reserve_order_idempotency_key(scoped_key: str, request_hash: str) -> Tuple[str, bool]:
+    """Claim an Idempotency-Key before creating the order.
+
+    Returns (order_id, replayed): a new order id to insert under, or the id of the
+    order an earlier request with the same key already created.
+    """
+    cached = recent_idempotency_keys.get(scoped_key)
+    if cached is not None:
+        if cached[0] != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different order")
+        return cached[1], True
+    
+    for _ in range(2):
+        order_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        try:
+            await db.order_idempotency_keys.insert_one({
+                "_id": scoped_key, "order_id": order_id, "request_hash": request_hash,
+                "completed": False, "created_at": now
+            })
+            return order_id, False
+        except DuplicateKeyError:
+            pass
+        
+        existing = await db.order_idempotency_keys.find_one({"_id": scoped_key})
+        if existing is None:
+            continue  # Released or expired in between; try to claim it again
+        if existing["request_hash"] != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different order")
+        if existing["completed"] or await db.orders.find_one({"id": existing["order_id"]}, {"_id": 1}):
+            recent_idempotency_keys.set(scoped_key, (request_hash, existing["order_id"]))
+            return existing["order_id"], True
+        if existing["created_at"] > now - timedelta(seconds=IDEMPOTENCY_PENDING_TIMEOUT_SECONDS):
+            break
+        # The request holding the key died before inserting its order; take the key over
+        await db.order_idempotency_keys.delete_one({"_id": scoped_key, "order_id": existing["order_id"]})
+    
+    raise HTTPException(
+        status_code=409,
+        detail="An order with this Idempotency-Key is still being processed",
+        headers={"Retry-After": "1"},
+    )
+
 @api_router.post("/orders")
-async def create_order(order_data: SimpleOrderCreate, current_user: User = Depends(require_role([UserRole.WAITRESS, UserRole.ADMINISTRATOR]))):
-    """Create new order with simple format (waitress only)"""
+async def create_order(
+    order_data: SimpleOrderCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=128),
+    current_user: TokenUser = Depends(require_role([UserRole.WAITRESS, UserRole.ADMINISTRATOR]))
+):
+    """Create new order with simple format (waitress only).
+
+    Retries carrying the same Idempotency-Key return the original order_id
+    instead of creating the order again.
+    """
+    order_id = None
+    if idempotency_key:
+        # Keys are per waitress, so two tablets can never collide
+        scoped_key = f"{current_user.id}:{idempotency_key}"
+        request_hash = order_request_hash(order_data)
+        order_id, replayed = await reserve_order_idempotency_key(scoped_key, request_hash)
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+            return {"success": True, "order_id": order_id}
+    
     try:
         # Create simple order document
         order = {
-            "id": str(uuid.uuid4()),
+            "id": order_id or str(uuid.uuid4()),
             "customer_name": order_data.customer_name,
             "table_number": order_data.table_number,
             "items": [item.dict() for item in order_data.items],
@@ -768,27 +2264,42 @@ async def create_order(order_data: SimpleOrderCreate, current_user: User = Depen
             "waitress_id": current_user.id,
             "waitress_name": current_user.full_name,
             "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "updated_at": datetime.utcnow(),
+            # Bumped by every status change so screens can discard out-of-order events
+            "revision": 0
         }
         
-        # Determine if order has food and/or drink items
-        has_food_items = False
-        has_drink_items = False
+        # Resolve every line item with one query
+        item_ids = list({base_item_id(item["menu_item_id"]) for item in order["items"]})
+        menu_items = {
+            menu_item["id"]: menu_item
+            async for menu_item in db.menu_items.find({"id": {"$in": item_ids}}, ORDER_MENU_ITEM_PROJECTION)
+        }
         
-        # Add menu item names to items and check types
+        unknown_items = []
+        unavailable_items = []
         for item in order["items"]:
-            menu_item = await db.menu_items.find_one({"id": item["menu_item_id"]})
-            if menu_item:
-                item["menu_item_name"] = menu_item["name"]
-                item["item_type"] = menu_item["item_type"]
-                if menu_item["item_type"] == "food":
-                    has_food_items = True
-                elif menu_item["item_type"] == "drink":
-                    has_drink_items = True
-            else:
-                item["menu_item_name"] = "Unknown Item"
-                item["item_type"] = "food"
-                has_food_items = True
+            is_bottle = item["menu_item_id"].endswith(BOTTLE_ITEM_SUFFIX)
+            menu_item = menu_items.get(base_item_id(item["menu_item_id"]))
+            if menu_item is None or (is_bottle and not menu_item.get("bottle_available", False)):
+                unknown_items.append(item["menu_item_id"])
+                continue
+            if not menu_item["available"] or menu_item["on_stop_list"]:
+                unavailable_items.append({"menu_item_id": item["menu_item_id"], "name": menu_item["name"]})
+                continue
+            item["menu_item_name"] = f"Бутылка {menu_item['name']}" if is_bottle else menu_item["name"]
+            item["item_type"] = menu_item["item_type"]
+        
+        if unknown_items or unavailable_items:
+            raise HTTPException(status_code=400, detail={
+                "message": "Some items cannot be ordered",
+                "unknown_items": unknown_items,
+                "unavailable_items": unavailable_items
+            })
+        
+        # Determine if order has food and/or drink items
+        has_food_items = any(item["item_type"] == "food" for item in order["items"])
+        has_drink_items = any(item["item_type"] == "drink" for item in order["items"])
         
         # Set appropriate statuses based on order contents
         order["has_food_items"] = has_food_items
@@ -797,13 +2308,24 @@ async def create_order(order_data: SimpleOrderCreate, current_user: User = Depen
         order["bar_status"] = "pending" if has_drink_items else "ready"
         
         await db.orders.insert_one(order)
-        return {"success": True, "order_id": order["id"]}
-        
+    except HTTPException:
+        if idempotency_key:
+            # The order was rejected, so a retry with this key must run again
+            await db.order_idempotency_keys.delete_one({"_id": scoped_key, "order_id": order_id})
+        raise
     except Exception as e:
+        # The insert may still have landed: the key stays reserved and a retry
+        # replays the order if it exists (see reserve_order_idempotency_key)
         raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
+    
+    await record_order_event("created", order)
+    if idempotency_key:
+        await db.order_idempotency_keys.update_one({"_id": scoped_key}, {"$set": {"completed": True}})
+        recent_idempotency_keys.set(scoped_key, (request_hash, order["id"]))
+    return {"success": True, "order_id": order["id"]}
 
 @api_router.get("/orders")
-async def get_orders(current_user: User = Depends(get_current_user)):
+async def get_orders(current_user: TokenUser = Depends(get_token_user)):
     """Get orders based on user role"""
     if current_user.role == UserRole.WAITRESS:
         # Waitress sees only their own orders
@@ -812,18 +2334,12 @@ async def get_orders(current_user: User = Depends(get_current_user)):
         # Kitchen, bartender, and administrator see all orders
         orders = await db.orders.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
     
-    return orders
+    return ORJSONResponse(orders)
 
-@api_router.get("/orders/admin")
-async def get_admin_orders(
-    current_user: User = Depends(require_role([UserRole.ADMINISTRATOR])),
-    hours_back: int = Query(24, description="Hours back from now to show orders (default: 24)"),
-    from_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
-    to_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
-    include_served: bool = Query(False, description="Include orders with 'served' status (default: false)")
-):
-    """Get orders for administrator with filtering options"""
-    
+ADMIN_ORDERS_INDEX = "created_at_-1"
+
+def build_admin_orders_filter(hours_back: int, from_date: Optional[str], to_date: Optional[str], include_served: bool) -> dict:
+    """Build the get_admin_orders query filter"""
     # Build date filter
     query_filter = {}
     
@@ -844,10 +2360,24 @@ async def get_admin_orders(
     if not include_served:
         query_filter["status"] = {"$ne": "served"}
     
-    # Get filtered orders
-    orders = await db.orders.find(query_filter, {"_id": 0}).sort("created_at", -1).to_list(1000)
+    return query_filter
+
+@api_router.get("/orders/admin")
+async def get_admin_orders(
+    current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR])),
+    hours_back: int = Query(24, description="Hours back from now to show orders (default: 24)"),
+    from_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
+    to_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
+    include_served: bool = Query(False, description="Include orders with 'served' status (default: false)")
+):
+    """Get orders for administrator with filtering options"""
+    query_filter = build_admin_orders_filter(hours_back, from_date, to_date, include_served)
     
-    return {
+    # Get filtered orders. The created_at index returns them in order; left to the planner,
+    # a status filter can pick status_1_created_at_1 and sort the whole range in memory
+    orders = await db.orders.find(query_filter, {"_id": 0}).sort("created_at", -1).hint(ADMIN_ORDERS_INDEX).to_list(1000)
+    
+    return ORJSONResponse({
         "orders": orders,
         "filters": {
             "hours_back": hours_back,
@@ -856,125 +2386,377 @@ async def get_admin_orders(
             "include_served": include_served,
             "total_count": len(orders)
         }
-    }
+    })
+
+def station_queue_pipeline(item_type: str) -> list:
+    """Active orders containing `item_type` items, oldest first, with only those items.
+
+    Matches on has_food_items / has_drink_items so the station's partial index is
+    used, and drops the other station's items in MongoDB with $filter.
+    """
+    flag_field = STATION_ORDER_FLAGS[item_type]
+    return [
+        {"$match": {flag_field: True, "status": {"$in": ACTIVE_ORDER_STATUSES}}},
+        {"$sort": {"created_at": 1}},
+        {"$set": {"items": {"$filter": {
+            "input": "$items", "as": "item", "cond": {"$eq": ["$$item.item_type", item_type]}
+        }}}},
+        {"$match": {"items.0": {"$exists": True}}},
+        {"$unset": "_id"}
+    ]
 
 @api_router.get("/orders/kitchen")
-async def get_kitchen_orders(current_user: User = Depends(require_role([UserRole.KITCHEN, UserRole.ADMINISTRATOR]))):
+async def get_kitchen_orders(current_user: TokenUser = Depends(require_role([UserRole.KITCHEN, UserRole.ADMINISTRATOR]))):
     """Get orders with food items for kitchen"""
-    orders = await db.orders.find({"status": {"$in": ["pending", "confirmed", "preparing"]}}, {"_id": 0}).sort("created_at", 1).to_list(1000)
-    
-    kitchen_orders = []
-    for order in orders:
-        # Filter items to show only food items
-        food_items = [item for item in order.get("items", []) if item.get("item_type") == "food"]
-        if food_items:
-            kitchen_order = order.copy()
-            kitchen_order["items"] = food_items
-            kitchen_orders.append(kitchen_order)
-    
-    return kitchen_orders
+    kitchen_orders = await db.orders.aggregate(station_queue_pipeline("food")).to_list(None)
+    return ORJSONResponse(kitchen_orders)
 
 @api_router.get("/orders/bar")
-async def get_bar_orders(current_user: User = Depends(require_role([UserRole.BARTENDER, UserRole.ADMINISTRATOR]))):
+async def get_bar_orders(current_user: TokenUser = Depends(require_role([UserRole.BARTENDER, UserRole.ADMINISTRATOR]))):
     """Get orders with drink items for bar"""
-    orders = await db.orders.find({"status": {"$in": ["pending", "confirmed", "preparing"]}}, {"_id": 0}).sort("created_at", 1).to_list(1000)
-    
-    bar_orders = []
-    for order in orders:
-        # Filter items to show only drink items
-        drink_items = [item for item in order.get("items", []) if item.get("item_type") == "drink"]
-        if drink_items:
-            bar_order = order.copy()
-            bar_order["items"] = drink_items
-            bar_orders.append(bar_order)
-    
-    return bar_orders
+    bar_orders = await db.orders.aggregate(station_queue_pipeline("drink")).to_list(None)
+    return ORJSONResponse(bar_orders)
+
+# Kitchen and bar screens: station -> (item type shown, roles allowed to subscribe)
+STATIONS = {
+    "kitchen": ("food", [UserRole.KITCHEN, UserRole.ADMINISTRATOR]),
+    "bar": ("drink", [UserRole.BARTENDER, UserRole.ADMINISTRATOR]),
+}
+
+def station_order_view(order: dict, item_type: str) -> Optional[dict]:
+    """The order as station_queue_pipeline returns it, or None when it is not on that queue"""
+    if not order.get(STATION_ORDER_FLAGS[item_type]) or order.get("status") not in ACTIVE_ORDER_STATUSES:
+        return None
+    items = [item for item in order.get("items", []) if item.get("item_type") == item_type]
+    if not items:
+        return None
+    return {**{key: value for key, value in order.items() if key != "_id"}, "items": items}
 
-@api_router.put("/orders/{order_id}")
-async def update_order_status(order_id: str, status_update: dict, current_user: User = Depends(get_current_user)):
-    """Update order status with smart mixed order logic"""
+def encode_station_event(event: dict, item_type: str) -> Optional[str]:
+    """An order_events entry as the message a station screen receives (None if it is not for that station)"""
+    order = event["order"]
+    if not order.get(STATION_ORDER_FLAGS[item_type]):
+        return None
+    view = station_order_view(order, item_type)
+    if view is None:
+        message = {"type": "order_removed", "seq": event["_id"], "order_id": order["id"], "revision": order.get("revision", 0)}
+    else:
+        message = {"type": "order_added" if event["kind"] == "created" else "order_updated", "seq": event["_id"], "order": view}
+    return orjson.dumps(message).decode()
+
+async def current_order_event_seq() -> int:
+    counter = await db.counters.find_one({"_id": "order_events"})
+    return counter["value"] if counter else 0
+
+async def record_order_event(kind: str, order: dict):
+    """Append an order write ("created" or "status") to the order_events log.
+
+    Called after the order itself is saved, so a failure is logged rather than
+    raised; screens catch up from a snapshot when they next reconnect.
+    """
     try:
-        order = await db.orders.find_one({"id": order_id})
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
+        counter = await db.counters.find_one_and_update(
+            {"_id": "order_events"},
+            {"$inc": {"value": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await db.order_events.insert_one({
+            "_id": counter["value"],
+            "kind": kind,
+            "order": {key: value for key, value in order.items() if key != "_id"},
+            "created_at": datetime.utcnow()
+        })
+    except Exception:
+        logger.exception("Failed to record order event for order %s", order.get("id"))
+        return
+    station_queue_hub.wake()
+
+class StationQueueHub:
+    """Kitchen and bar WebSocket connections of this worker, fed from the order_events log.
+
+    One watcher task per worker reads the log in sequence order, woken right away
+    by local writes and polling for those of other workers, and sends each screen
+    the events for its station. A sequence number that was allocated but not yet
+    written holds back later events for up to gap_wait seconds, so a screen's last
+    seen sequence number is always a safe point to resume from.
+    """
+
+    def __init__(self, poll_seconds: float, gap_wait: float, send_timeout: float):
+        self.poll_seconds = poll_seconds
+        self.gap_wait = gap_wait
+        self.send_timeout = send_timeout
+        # websocket -> {"item_type", "backlog"}; backlog collects events until the
+        # connection's snapshot or replay has been sent, then becomes None
+        self.connections = {}
+        self.seq = 0
+        self._gap_since = None
+        self._wakeup = asyncio.Event()
+        self._watcher = None
+        self.delivered = 0
+        self.snapshots = 0
+        self.resumes = 0
+        self.dropped = 0
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def start(self):
+        self.seq = await current_order_event_seq()
+        self._watcher = asyncio.get_running_loop().create_task(self._watch())
+
+    def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+
+    async def _watch(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Failed to read order events")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def poll(self):
+        """Deliver the events written since the last poll, in sequence order"""
+        events = await db.order_events.find({"_id": {"$gt": self.seq}}).sort("_id", 1).to_list(500)
+        ready = []
+        for event in events:
+            if event["_id"] != self.seq + 1:
+                if self._gap_since is None:
+                    self._gap_since = time.monotonic()
+                if time.monotonic() - self._gap_since < self.gap_wait:
+                    break
+                logger.warning("Order events %d-%d were never written", self.seq + 1, event["_id"] - 1)
+            self._gap_since = None
+            ready.append(event)
+            self.seq = event["_id"]
+        if len(events) == 500:
+            self.wake()
+        if ready:
+            self.delivered += len(ready)
+            await self._deliver(ready)
+
+    async def _deliver(self, events: list):
+        encoded = {}
+        outgoing = {}
+        for websocket, connection in list(self.connections.items()):
+            if connection["backlog"] is not None:
+                connection["backlog"].extend(events)
+                continue
+            messages = []
+            for event in events:
+                key = (event["_id"], connection["item_type"])
+                if key not in encoded:
+                    encoded[key] = encode_station_event(event, connection["item_type"])
+                if encoded[key]:
+                    messages.append(encoded[key])
+            if messages:
+                outgoing[websocket] = messages
         
-        new_status = status_update.get("status")
-        update_fields = {"updated_at": datetime.utcnow()}
+        websockets = list(outgoing)
+        sent = await asyncio.gather(*(self._send(ws, outgoing[ws]) for ws in websockets))
+        for websocket, ok in zip(websockets, sent):
+            if not ok and websocket in self.connections:
+                # The screen resumes from its last sequence number when it reconnects
+                self.disconnect(websocket)
+                self.dropped += 1
+                try:
+                    await asyncio.wait_for(websocket.close(), self.send_timeout)
+                except Exception:
+                    pass
+
+    async def _send(self, websocket: WebSocket, messages: list) -> bool:
+        try:
+            for message in messages:
+                await asyncio.wait_for(websocket.send_text(message), self.send_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _can_resume(self, since: int) -> bool:
+        """True while every event after `since` is still in the log"""
+        first = await db.order_events.find_one({"_id": {"$gt": since}}, {"_id": 1}, sort=[("_id", 1)])
+        return first is not None and first["_id"] == since + 1
+
+    async def subscribe(self, websocket: WebSocket, item_type: str, since: Optional[int]):
+        """Register an accepted connection and bring it up to date.
+
+        Replays the events after `since` when the log still has all of them,
+        otherwise sends a snapshot of the station queue. Events delivered in the
+        meantime are held back and sent afterwards, so none are missed.
+        """
+        connection = {"item_type": item_type, "backlog": []}
+        self.connections[websocket] = connection
+        upto = self.seq
         
-        # Determine what part of the order to update based on user role
-        if current_user.role == UserRole.KITCHEN:
-            # Kitchen updates food status
-            update_fields["kitchen_status"] = new_status
-        elif current_user.role == UserRole.BARTENDER:
-            # Bar updates drink status  
-            update_fields["bar_status"] = new_status
+        if since is not None and since >= 0 and (since >= upto or await self._can_resume(since)):
+            self.resumes += 1
+            replay = db.order_events.find({"_id": {"$gt": since, "$lte": upto}}).sort("_id", 1)
+            async for event in replay:
+                message = encode_station_event(event, item_type)
+                if message:
+                    await websocket.send_text(message)
+            upto = max(since, upto)
+            await websocket.send_text(orjson.dumps({"type": "resumed", "seq": upto}).decode())
         else:
-            # Admin can update overall status directly
-            update_fields["status"] = new_status
-            
-        # Calculate overall order status for mixed orders
-        if current_user.role in [UserRole.KITCHEN, UserRole.BARTENDER]:
-            current_kitchen_status = order.get("kitchen_status", "pending")
-            current_bar_status = order.get("bar_status", "pending")
-            has_food = order.get("has_food_items", False)
-            has_drinks = order.get("has_drink_items", False)
-            
-            # Update the specific status
-            if current_user.role == UserRole.KITCHEN:
-                current_kitchen_status = new_status
-            else:
-                current_bar_status = new_status
-            
-            # Determine overall status
-            if has_food and has_drinks:
+            self.snapshots += 1
+            orders = await db.orders.aggregate(station_queue_pipeline(item_type)).to_list(None)
+            await websocket.send_text(orjson.dumps({"type": "snapshot", "seq": upto, "orders": orders}).decode())
+        
+        while connection["backlog"]:
+            events, connection["backlog"] = connection["backlog"], []
+            for event in events:
+                message = encode_station_event(event, item_type) if event["_id"] > upto else None
+                if message:
+                    await websocket.send_text(message)
+        connection["backlog"] = None
+
+    def disconnect(self, websocket: WebSocket):
+        self.connections.pop(websocket, None)
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.connections),
+            "seq": self.seq,
+            "delivered": self.delivered,
+            "snapshots": self.snapshots,
+            "resumes": self.resumes,
+            "dropped": self.dropped,
+        }
+
+station_queue_hub = StationQueueHub(ORDER_EVENT_POLL_SECONDS, ORDER_EVENT_GAP_WAIT_SECONDS, STATION_SEND_TIMEOUT_SECONDS)
+
+@api_router.websocket("/ws/orders/{station}")
+async def station_queue_socket(
+    websocket: WebSocket,
+    station: str,
+    token: str = Query(...),
+    since: Optional[int] = Query(None)
+):
+    """Live kitchen or bar queue: a snapshot, then order_added / order_updated / order_removed events.
+
+    Every message carries `seq`. A screen that reconnects with ?since=<last seq>
+    gets only the events it missed (followed by {type: resumed}), or a new snapshot
+    when they are no longer in the log. The token is passed as a query parameter
+    as for /ws/menu.
+    """
+    try:
+        user = await token_user_from_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if station not in STATIONS or user.role not in STATIONS[station][1]:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    try:
+        await station_queue_hub.subscribe(websocket, STATIONS[station][0], since)
+        while True:
+            if await websocket.receive_text() == "ping":
+                await websocket.send_text('{"type":"pong"}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        station_queue_hub.disconnect(websocket)
+
+def order_status_update_pipeline(role: str, new_status) -> list:
+    """Aggregation-pipeline update applying a status change as `role`.
+
+    Kitchen and bar set their own part; the overall status is then derived in
+    MongoDB from the stored kitchen_status / bar_status, so simultaneous kitchen
+    and bar updates of a mixed order always see each other's writes.
+    """
+    # $literal keeps a client-supplied status from being read as a field path
+    new_status = {"$literal": new_status}
+    if role == UserRole.KITCHEN:
+        # Kitchen updates food status
+        changes = {"kitchen_status": new_status}
+    elif role == UserRole.BARTENDER:
+        # Bar updates drink status
+        changes = {"bar_status": new_status}
+    else:
+        # Admin can update overall status directly
+        changes = {"status": new_status}
+    
+    pipeline = [{"$set": {
+        **changes,
+        "updated_at": datetime.utcnow(),
+        "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]}
+    }}]
+    
+    if role in [UserRole.KITCHEN, UserRole.BARTENDER]:
+        kitchen_status = {"$ifNull": ["$kitchen_status", "pending"]}
+        bar_status = {"$ifNull": ["$bar_status", "pending"]}
+        has_food = {"$eq": ["$has_food_items", True]}
+        has_drinks = {"$eq": ["$has_drink_items", True]}
+        pipeline.append({"$set": {"status": {"$switch": {
+            "branches": [
                 # Mixed order - both parts must be ready
-                if current_kitchen_status == "ready" and current_bar_status == "ready":
-                    update_fields["status"] = "ready"
-                elif current_kitchen_status == "served" and current_bar_status == "served":
-                    update_fields["status"] = "served"  
-                else:
-                    update_fields["status"] = "preparing"
-            elif has_food:
+                {"case": {"$and": [has_food, has_drinks]}, "then": {"$switch": {
+                    "branches": [
+                        {"case": {"$and": [{"$eq": [kitchen_status, "ready"]}, {"$eq": [bar_status, "ready"]}]},
+                         "then": "ready"},
+                        {"case": {"$and": [{"$eq": [kitchen_status, "served"]}, {"$eq": [bar_status, "served"]}]},
+                         "then": "served"},
+                    ],
+                    "default": "preparing"
+                }}},
                 # Food-only order
-                update_fields["status"] = current_kitchen_status
-            elif has_drinks:
+                {"case": has_food, "then": kitchen_status},
                 # Drink-only order
-                update_fields["status"] = current_bar_status
-        
-        result = await db.orders.update_one(
+                {"case": has_drinks, "then": bar_status},
+            ],
+            "default": "$status"
+        }}}})
+    return pipeline
+
+@api_router.put("/orders/{order_id}")
+async def update_order_status(order_id: str, status_update: dict, current_user: TokenUser = Depends(get_token_user)):
+    """Update order status with smart mixed order logic, in one atomic round trip"""
+    try:
+        updated = await db.orders.find_one_and_update(
             {"id": order_id},
-            {"$set": update_fields}
+            order_status_update_pipeline(current_user.role, status_update.get("status")),
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
         )
-        
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Order not found")
-            
-        return {"success": True}
-        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update order: {str(e)}")
+    
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    await record_order_event("status", updated)
+    return {"success": True}
 
 @api_router.get("/orders/table/{table_number}")
-async def get_orders_by_table(table_number: int, current_user: User = Depends(get_current_user)):
+async def get_orders_by_table(table_number: int, current_user: TokenUser = Depends(get_token_user)):
     """Get orders for a specific table"""
     orders = await db.orders.find({"table_number": table_number}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return orders
+    return ORJSONResponse(orders)
 
 # Menu item management endpoints
 @api_router.post("/menu", response_model=MenuItem)
-async def create_menu_item(menu_item: MenuItemCreate, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def create_menu_item(menu_item: MenuItemCreate, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Create a new menu item (admin only)"""
     # Verify category exists
     category = await db.categories.find_one({"id": menu_item.category_id})
     if not category:
         raise HTTPException(status_code=400, detail="Category not found")
     
-    new_item = MenuItem(**menu_item.dict())
+    new_item = MenuItem(**menu_item.dict(), **category_fields(category), version=await next_menu_version())
     await db.menu_items.insert_one(new_item.dict())
+    menu_snapshot.invalidate()
     return new_item
 
 @api_router.put("/menu/{item_id}", response_model=MenuItem)
-async def update_menu_item(item_id: str, menu_item: MenuItemUpdate, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def update_menu_item(item_id: str, menu_item: MenuItemUpdate, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Update a menu item (admin only)"""
     existing_item = await db.menu_items.find_one({"id": item_id})
     if not existing_item:
@@ -987,35 +2769,41 @@ async def update_menu_item(item_id: str, menu_item: MenuItemUpdate, current_user
             raise HTTPException(status_code=400, detail="Category not found")
     
     update_data = {k: v for k, v in menu_item.dict().items() if v is not None}
+    if menu_item.category_id:
+        update_data.update(category_fields(category))
     update_data["updated_at"] = datetime.utcnow()
+    update_data["version"] = await next_menu_version()
     
     await db.menu_items.update_one(
         {"id": item_id},
         {"$set": update_data}
     )
+    menu_snapshot.invalidate()
     
     updated_item = await db.menu_items.find_one({"id": item_id})
     return MenuItem(**updated_item)
 
 @api_router.delete("/menu/{item_id}")
-async def delete_menu_item(item_id: str, current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def delete_menu_item(item_id: str, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Delete a menu item (admin only)"""
     existing_item = await db.menu_items.find_one({"id": item_id})
     if not existing_item:
         raise HTTPException(status_code=404, detail="Menu item not found")
     
     await db.menu_items.delete_one({"id": item_id})
+    await record_menu_tombstone("menu_item", item_id, await next_menu_version())
+    menu_snapshot.invalidate()
     return {"message": "Menu item deleted successfully"}
 
 # Table management
 @api_router.get("/tables")
-async def get_tables(current_user: User = Depends(get_current_user)):
+async def get_tables(current_user: TokenUser = Depends(get_token_user)):
     """Get available tables"""
-    return {"tables": list(range(1, 29))}  # Tables 1-28
+    return {"tables": TABLE_NUMBERS}
 
 # Dashboard stats
 @api_router.get("/dashboard/stats")
-async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
+async def get_dashboard_stats(current_user: TokenUser = Depends(get_token_user)):
     """Get dashboard statistics"""
     if current_user.role == UserRole.WAITRESS:
         # Waitress sees only their own stats
@@ -1024,7 +2812,11 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
         # Others see all stats
         filter_query = {}
     
-    total_orders = await db.orders.count_documents(filter_query)
+    # Unfiltered totals come from collection metadata instead of scanning every document
+    if filter_query:
+        total_orders = await db.orders.count_documents(filter_query)
+    else:
+        total_orders = await db.orders.estimated_document_count()
     pending_orders = await db.orders.count_documents({**filter_query, "status": OrderStatus.PENDING})
     confirmed_orders = await db.orders.count_documents({**filter_query, "status": OrderStatus.CONFIRMED})
     preparing_orders = await db.orders.count_documents({**filter_query, "status": OrderStatus.PREPARING})
@@ -1032,7 +2824,7 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
     
     # Additional stats for admin
     if current_user.role == UserRole.ADMINISTRATOR:
-        total_users = await db.users.count_documents({})
+        total_users = await db.users.estimated_document_count()
         total_categories = await db.categories.count_documents({"is_active": True})
         total_menu_items = await db.menu_items.count_documents({"available": True})
         
@@ -1071,12 +2863,15 @@ class MenuItemAvailabilityToggle(BaseModel):
 @api_router.post("/menu/import", response_model=ImportResult)
 async def import_menu_from_xlsx(
     file: UploadFile = File(...),
-    current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))
+    current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))
 ):
     """Import menu items from XLSX file (admin only)"""
     if not file.filename.endswith('.xlsx'):
         raise HTTPException(status_code=400, detail="Only XLSX files are supported")
     
+    # pandas (with numpy/openpyxl) is only needed here, so it is imported on first use
+    import pandas as pd
+    
     try:
         # Read the uploaded file
         contents = await file.read()
@@ -1093,12 +2888,14 @@ async def import_menu_from_xlsx(
             )
         
         # Get all categories for validation
-        categories = await db.categories.find({}, {"_id": 0}).to_list(1000)
-        category_ids = {cat['id'] for cat in categories}
+        categories = await db.categories.find({}, {"_id": 0}).to_list(None)
+        categories_by_id = {cat['id']: cat for cat in categories}
         
         created_items = 0
         updated_items = 0
         errors = []
+        # Ids of written rows; they get one menu version once the loop is done
+        imported_ids = []
         
         for index, row in df.iterrows():
             try:
@@ -1120,7 +2917,7 @@ async def import_menu_from_xlsx(
                     continue
                 
                 category_id = str(row['category_id']).strip()
-                if category_id not in category_ids:
+                if category_id not in categories_by_id:
                     errors.append(f"Row {index + 2}: Category '{category_id}' not found")
                     continue
                 
@@ -1163,6 +2960,7 @@ async def import_menu_from_xlsx(
                     "on_stop_list": False,  # Default to not on stop list
                     "bottle_available": bottle_available,
                     "bottle_price": bottle_price,
+                    **category_fields(categories_by_id[category_id]),
                     "updated_at": datetime.utcnow()
                 }
                 
@@ -1172,19 +2970,29 @@ async def import_menu_from_xlsx(
                         {"id": existing_item["id"]},
                         {"$set": menu_item_data}
                     )
+                    imported_ids.append(existing_item["id"])
                     updated_items += 1
                 else:
-                    # Create new item
+                    # Create new item; version 0 keeps it out of /menu/changes until stamped below
                     menu_item_data.update({
                         "id": str(uuid.uuid4()),
+                        "version": 0,
                         "created_at": datetime.utcnow()
                     })
                     await db.menu_items.insert_one(menu_item_data)
+                    imported_ids.append(menu_item_data["id"])
                     created_items += 1
                     
             except Exception as e:
                 errors.append(f"Row {index + 2}: {str(e)}")
         
+        if imported_ids:
+            # Versioned after every row is written, so a client that polled /menu/changes
+            # mid-import still receives all of them however long the loop took
+            import_version = await next_menu_version()
+            await db.menu_items.update_many({"id": {"$in": imported_ids}}, {"$set": {"version": import_version}})
+            menu_snapshot.invalidate()
+        
         return ImportResult(
             success=len(errors) == 0,
             total_items=len(df),
@@ -1201,66 +3009,404 @@ async def import_menu_from_xlsx(
 async def toggle_menu_item_availability(
     item_id: str,
     availability: MenuItemAvailabilityToggle,
-    current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))
+    current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))
 ):
     """Toggle menu item availability (admin only)"""
     existing_item = await db.menu_items.find_one({"id": item_id})
     if not existing_item:
         raise HTTPException(status_code=404, detail="Menu item not found")
     
+    version = await next_menu_version()
     await db.menu_items.update_one(
         {"id": item_id},
-        {"$set": {"available": availability.available, "updated_at": datetime.utcnow()}}
+        {"$set": {"available": availability.available, "version": version, "updated_at": datetime.utcnow()}}
     )
+    menu_snapshot.invalidate()
     
     return {"success": True, "message": f"Item availability updated to {availability.available}"}
 
+# Menu images
+MENU_IMAGE_URL_PREFIX = "/api/media/menu"
+MENU_IMAGE_FILENAME_RE = re.compile(r"^[0-9a-f]{20}(-[a-z]+)?\.(jpg|png|webp)$")
+MENU_IMAGE_MEDIA_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+def _write_file_atomic(path: Path, data: bytes):
+    """Write via a temporary file and rename, so readers never see a partial image"""
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+def process_menu_image(data: bytes) -> dict:
+    """Store an uploaded image and its WebP/JPEG thumbnails; runs in menu_image_pool.
+
+    Files are named by the SHA-256 of the upload, so URLs never change content and
+    re-uploading the same photo reuses the existing files.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError  # Loaded on first upload only
+
+    # Pillow refuses to open images above twice this many pixels (DecompressionBombError);
+    # anything above the limit itself is rejected by the size check below
+    Image.MAX_IMAGE_PIXELS = MENU_IMAGE_MAX_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            image_format = probe.format
+            width, height = probe.size
+            probe.verify()
+    except Image.DecompressionBombError:
+        raise ValueError("Image dimensions are too large")
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise ValueError("File is not a valid image")
+    if image_format not in ("JPEG", "PNG", "WEBP"):
+        raise ValueError("Only JPEG, PNG and WebP images are supported")
+    if width * height > MENU_IMAGE_MAX_PIXELS:
+        raise ValueError("Image dimensions are too large")
+
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    MENU_IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+    extension = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}[image_format]
+    original_name = f"{digest}.{extension}"
+    if not (MENU_IMAGE_DIR / original_name).exists():
+        _write_file_atomic(MENU_IMAGE_DIR / original_name, data)
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Phone photos store their rotation in EXIF; apply it before resizing
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        width, height = image.size
+        result = {"original": f"{MENU_IMAGE_URL_PREFIX}/{original_name}", "width": width, "height": height}
+        for size_name, longest_side in MENU_IMAGE_SIZES.items():
+            variant = {}
+            resized = None
+            for key, extension, save_options in (
+                ("webp", "webp", {"format": "WEBP", "quality": 80, "method": 4}),
+                ("jpeg", "jpg", {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True}),
+            ):
+                name = f"{digest}-{size_name}.{extension}"
+                variant[key] = f"{MENU_IMAGE_URL_PREFIX}/{name}"
+                if (MENU_IMAGE_DIR / name).exists():
+                    continue
+                if resized is None:
+                    resized = image.copy()
+                    resized.thumbnail((longest_side, longest_side), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, **save_options)
+                _write_file_atomic(MENU_IMAGE_DIR / name, buffer.getvalue())
+            result[size_name] = variant
+    return result
+
+@api_router.post("/menu/{item_id}/image", response_model=MenuItem)
+async def upload_menu_item_image(
+    item_id: str,
+    file: UploadFile = File(...),
+    current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))
+):
+    """Upload a menu item photo; thumbnails are generated once here, not per view (admin only)"""
+    if not await db.menu_items.find_one({"id": item_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    
+    data = await file.read(MENU_IMAGE_MAX_BYTES + 1)
+    if len(data) > MENU_IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image must be at most {MENU_IMAGE_MAX_BYTES // (1024 * 1024)} MB")
+    try:
+        images = await menu_image_pool.run(process_menu_image, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    version = await next_menu_version()
+    updated_item = await db.menu_items.find_one_and_update(
+        {"id": item_id},
+        {"$set": {
+            "image_url": images["tablet"]["webp"],
+            "images": images,
+            "version": version,
+            "updated_at": datetime.utcnow()
+        }},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_item:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    menu_snapshot.invalidate()
+    return MenuItem(**updated_item)
+
+@api_router.get("/media/menu/{filename}")
+async def get_menu_image(filename: str):
+    """Serve a stored menu image; URLs are content-hashed, so they can be cached forever"""
+    # Public: <img> tags cannot send the Authorization header
+    if not MENU_IMAGE_FILENAME_RE.match(filename):
+        raise HTTPException(status_code=404, detail="Image not found")
+    path = MENU_IMAGE_DIR / filename
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(
+        path,
+        media_type=MENU_IMAGE_MEDIA_TYPES[filename.rsplit(".", 1)[1]],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+# Public QR-code menu
+def public_menu_categories(snapshot: MenuSnapshot) -> list:
+    """Guest-facing menu: active categories with the items that can be ordered right now"""
+    items_by_category = {}
+    for item in snapshot.menu:
+        if not item["available"] or item["on_stop_list"]:
+            continue
+        images = item.get("images")
+        items_by_category.setdefault(item["category_id"], []).append({
+            "id": item["id"],
+            "name": item["name"],
+            "description": item["description"],
+            "price": item["price"],
+            "item_type": item["item_type"],
+            "bottle_price": item["bottle_price"] if item["bottle_available"] else None,
+            "thumb": images["thumb"] if images else None,
+        })
+    return [
+        {"id": cat["id"], "display_name": cat["display_name"], "emoji": cat["emoji"], "items": items_by_category[cat["id"]]}
+        for cat in snapshot.active_categories if cat["id"] in items_by_category
+    ]
+
+PUBLIC_MENU_HTML = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>YomaBar — Меню</title>
+<style>
+body{{margin:0;font-family:system-ui,-apple-system,sans-serif;background:#f9fafb;color:#111827}}
+header{{background:#dc2626;color:#fff;padding:16px;text-align:center}}
+header h1{{margin:0;font-size:24px}}
+#table{{margin-top:4px;font-size:14px}}
+nav{{display:flex;gap:8px;overflow-x:auto;padding:8px 16px;background:#fff;position:sticky;top:0;box-shadow:0 1px 2px #0001}}
+nav a{{white-space:nowrap;color:#dc2626;text-decoration:none;font-size:14px;padding:4px 8px;border:1px solid #fecaca;border-radius:999px}}
+main{{max-width:720px;margin:0 auto;padding:8px 16px 32px}}
+h2{{font-size:20px;margin:24px 0 8px}}
+.item{{display:flex;gap:12px;background:#fff;border-radius:8px;padding:12px;margin-bottom:8px;box-shadow:0 1px 2px #0001}}
+.item img{{width:96px;height:96px;object-fit:cover;border-radius:6px;flex:none}}
+.item h3{{margin:0;font-size:16px}}
+.item p{{margin:4px 0;color:#4b5563;font-size:14px}}
+.price{{font-weight:600;color:#dc2626}}
+</style>
+</head>
+<body>
+<header><h1>🍽️ YomaBar</h1><div id="table"></div></header>
+<nav>{nav}</nav>
+<main>{sections}</main>
+<script>
+var table = new URLSearchParams(location.search).get("table");
+if (table && /^\\d+$/.test(table)) document.getElementById("table").textContent = "Стол " + table;
+</script>
+</body>
+</html>
+"""
+
+def render_public_menu_html(categories: list) -> str:
+    """Static HTML page for the public menu (no JavaScript needed to show the menu)"""
+    escape = html.escape
+    nav = "".join(
+        f'<a href="#c-{escape(cat["id"])}">{escape(cat["emoji"])} {escape(cat["display_name"])}</a>'
+        for cat in categories
+    )
+    sections = []
+    for cat in categories:
+        items = []
+        for item in cat["items"]:
+            picture = ""
+            if item["thumb"]:
+                picture = (
+                    f'<picture><source srcset="{escape(item["thumb"]["webp"])}" type="image/webp">'
+                    f'<img src="{escape(item["thumb"]["jpeg"])}" alt="" loading="lazy"></picture>'
+                )
+            price = f'${item["price"]:.2f}'
+            if item["bottle_price"] is not None:
+                price += f' · бутылка ${item["bottle_price"]:.2f}'
+            items.append(
+                f'<div class="item">{picture}<div><h3>{escape(item["name"])}</h3>'
+                f'<p>{escape(item["description"])}</p><div class="price">{price}</div></div></div>'
+            )
+        sections.append(
+            f'<section id="c-{escape(cat["id"])}"><h2>{escape(cat["emoji"])} {escape(cat["display_name"])}</h2>'
+            + "".join(items) + "</section>"
+        )
+    return PUBLIC_MENU_HTML.format(nav=nav, sections="".join(sections))
+
+class PublicMenuPublisher:
+    """Keeps menu.json and index.html in PUBLIC_MENU_DIR in step with the menu.
+
+    Re-rendered (debounced) after local menu writes and when the shared menu
+    version moves because another worker wrote; files are only rewritten when the
+    guest-visible content changed. The last render is kept in memory for the
+    dynamic /public/menu fallback.
+    """
+
+    def __init__(self, directory: Path, debounce_seconds: float, check_seconds: float):
+        self.directory = directory
+        self.debounce_seconds = debounce_seconds
+        self.check_seconds = check_seconds
+        self.menu_version = None
+        self.digest = None
+        self.json_body = None
+        self.html_body = None
+        self._lock = asyncio.Lock()
+        self._pending = None
+        self._watcher = None
+        self.renders = 0
+        self.writes = 0
+
+    def schedule(self):
+        """Re-render shortly; calls made while one is pending are coalesced"""
+        if self._pending is not None and not self._pending.done():
+            return
+        try:
+            self._pending = asyncio.get_running_loop().create_task(self._refresh_later())
+        except RuntimeError:
+            pass  # No event loop (e.g. CLI commands); the watcher catches up
+
+    async def _refresh_later(self):
+        await asyncio.sleep(self.debounce_seconds)
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("Failed to render the public menu")
+
+    async def refresh(self):
+        async with self._lock:
+            snapshot = await menu_snapshot.get()
+            categories = public_menu_categories(snapshot)
+            content = orjson.dumps(categories)
+            digest = hashlib.sha1(content).hexdigest()[:20]
+            self.renders += 1
+            if digest != self.digest:
+                json_body = orjson.dumps({"generated_at": datetime.utcnow(), "categories": categories})
+                html_body = render_public_menu_html(categories).encode("utf-8")
+                await asyncio.to_thread(self._write_files, json_body, html_body)
+                self.json_body, self.html_body, self.digest = json_body, html_body, digest
+                self.writes += 1
+            self.menu_version = snapshot.menu_version
+
+    def _write_files(self, json_body: bytes, html_body: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _write_file_atomic(self.directory / "menu.json", json_body)
+        _write_file_atomic(self.directory / "index.html", html_body)
+
+    async def _watch(self):
+        while True:
+            try:
+                if self.menu_version != await current_menu_version():
+                    await self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh the public menu")
+            await asyncio.sleep(self.check_seconds)
+
+    def start(self):
+        self._watcher = asyncio.get_running_loop().create_task(self._watch())
+
+    def stop(self):
+        for task in (self._watcher, self._pending):
+            if task is not None:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "menu_version": self.menu_version,
+            "digest": self.digest,
+            "renders": self.renders,
+            "writes": self.writes,
+            "directory": str(self.directory),
+        }
+
+public_menu = PublicMenuPublisher(PUBLIC_MENU_DIR, PUBLIC_MENU_DEBOUNCE_SECONDS, PUBLIC_MENU_CHECK_SECONDS)
+menu_snapshot.listeners.append(public_menu.schedule)
+
+class RateLimiter:
+    """Fixed-window request counter per key (client IP)"""
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._window = None
+        self._counts = {}
+        self.rejected = 0
+
+    def retry_after(self, key: str) -> Optional[int]:
+        """Count one request; returns seconds to wait when over the limit, else None"""
+        now = time.monotonic()
+        window = int(now // self.window_seconds)
+        if window != self._window:
+            # Starting a new window drops every old counter at once
+            self._window = window
+            self._counts = {}
+        count = self._counts.get(key, 0) + 1
+        self._counts[key] = count
+        if count <= self.limit:
+            return None
+        self.rejected += 1
+        return max(1, int((window + 1) * self.window_seconds - now + 0.999))
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "window_seconds": self.window_seconds, "clients": len(self._counts), "rejected": self.rejected}
+
+public_menu_rate_limiter = RateLimiter(PUBLIC_MENU_RATE_LIMIT, PUBLIC_MENU_RATE_WINDOW_SECONDS)
+
+def client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.rsplit(",", 1)[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+async def public_menu_response(request: Request, body_attr: str, media_type: str) -> Response:
+    retry_after = public_menu_rate_limiter.retry_after(client_ip(request))
+    if retry_after is not None:
+        raise HTTPException(status_code=429, detail="Too many requests", headers={"Retry-After": str(retry_after)})
+    if public_menu.digest is None:
+        await public_menu.refresh()
+    etag = f'"public-{public_menu.digest}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=getattr(public_menu, body_attr), media_type=media_type, headers=headers)
+
+@api_router.get("/public/menu")
+async def get_public_menu(request: Request):
+    """Public read-only menu for guests (no authentication, rate limited per IP)"""
+    return await public_menu_response(request, "json_body", "application/json")
+
+@api_router.get("/public/menu.html")
+async def get_public_menu_html(request: Request):
+    """Public menu page the table QR codes point to (no authentication, rate limited per IP)"""
+    return await public_menu_response(request, "html_body", "text/html; charset=utf-8")
+
+@api_router.get("/tables/menu-links")
+async def get_table_menu_links(request: Request, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
+    """Absolute public menu URL for each table, to print as QR codes (admin only)"""
+    published = await asyncio.to_thread((PUBLIC_MENU_DIR / "index.html").exists)
+    # A phone scanning the code has no host to resolve a relative path against
+    url = urljoin(str(request.base_url), PUBLIC_MENU_URL if published else PUBLIC_MENU_FALLBACK_URL)
+    return {"links": [{"table": table, "url": f"{url}?table={table}"} for table in TABLE_NUMBERS]}
+
 # Get menu stats (including hidden items count)
 @api_router.get("/menu/stats")
-async def get_menu_stats(current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))):
+async def get_menu_stats(request: Request, current_user: TokenUser = Depends(require_role([UserRole.ADMINISTRATOR]))):
     """Get menu statistics (admin only)"""
-    total_items = await db.menu_items.count_documents({})
-    available_items = await db.menu_items.count_documents({"available": True})
-    hidden_items = await db.menu_items.count_documents({"available": False})
-    
-    # Group by category
-    pipeline = [
-        {"$group": {"_id": "$category_id", "count": {"$sum": 1}}},
-        {
-            "$lookup": {
-                "from": "categories",
-                "localField": "_id", 
-                "foreignField": "id",
-                "as": "category"
-            }
-        },
-        {"$unwind": "$category"},
-        {
-            "$project": {
-                "category_name": "$category.display_name",
-                "count": 1
-            }
-        }
-    ]
-    
-    category_counts = await db.menu_items.aggregate(pipeline).to_list(1000)
-    
-    return {
-        "total_items": total_items,
-        "available_items": available_items,
-        "hidden_items": hidden_items,
-        "by_category": category_counts
-    }
+    # Derived from the menu snapshot, so dashboard refreshes cost no queries until the menu changes
+    snapshot = await menu_snapshot.get()
+    return conditional_response(request, snapshot, "stats", snapshot.stats())
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# The published public menu as static files, with no rendering or rate limiting per request
+app.mount(PUBLIC_MENU_STATIC_PATH, StaticFiles(directory=PUBLIC_MENU_DIR, check_dir=False), name="public-menu")
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Menu-Version"],
 )
 
 # Configure logging
@@ -1273,8 +3419,57 @@ logger = logging.getLogger(__name__)
 @app.on_event("startup")
 async def startup_event():
     """Initialize data on startup"""
+    started = time.perf_counter()
+    await ensure_indexes()
+    # create_user, create_category and their updates rely on these to reject duplicates
+    missing_unique = await missing_unique_indexes()
+    if missing_unique:
+        raise RuntimeError(
+            f"Unique indexes {', '.join(missing_unique)} could not be built; remove the duplicate "
+            "documents and run `python server.py ensure-indexes`"
+        )
+    logger.info("Indexes ensured in %.1f ms", (time.perf_counter() - started) * 1000)
     await init_default_data()
+    # Menu items stored before category fields were denormalized onto them
+    if await db.menu_items.find_one({"category_sort_order": None}, {"_id": 1}):
+        migrated = await migrate_menu_item_category_fields()
+        logger.info("Copied category fields onto %d menu items", migrated)
+    public_menu.start()
+    await menu_availability_hub.start()
+    await station_queue_hub.start()
+    logger.info("Startup completed in %.1f ms", (time.perf_counter() - started) * 1000)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    public_menu.stop()
+    menu_availability_hub.stop()
+    station_queue_hub.stop()
+    client.close()
+    password_hash_pool.shutdown()
+    menu_image_pool.shutdown()
+
+if __name__ == "__main__":
+    # Maintenance CLI, e.g. `python server.py ensure-indexes`
+    import argparse
+    import json
+    
+    parser = argparse.ArgumentParser(description="YomaBar backend maintenance commands")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("ensure-indexes", help="Create or update every declared index")
+    subcommands.add_parser("index-report", help="Show which declared indexes exist or are missing")
+    subcommands.add_parser("migrate-menu-categories", help="Copy category fields onto every menu item")
+    args = parser.parse_args()
+    
+    async def run_command():
+        if args.command == "ensure-indexes":
+            errors = await ensure_indexes()
+            print(json.dumps({"errors": errors, "report": await index_report()}, indent=2))
+            return 1 if errors else 0
+        if args.command == "migrate-menu-categories":
+            print(json.dumps({"modified_items": await migrate_menu_item_category_fields()}))
+            return 0
+        report = await index_report()
+        print(json.dumps(report, indent=2))
+        return 1 if any(r["missing"] or r["mismatched"] for r in report.values()) else 0
+    
+    raise SystemExit(asyncio.run(run_command()))
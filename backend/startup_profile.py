@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Startup profile for the backend worker.
+
+Imports the server's dependencies one by one, then the server module itself, and
+reports the wall-clock import time and resident memory added by each step.
+Run from the backend directory:
+
+    python startup_profile.py [extra.module ...]
+"""
+
+import importlib
+import os
+import sys
+import time
+
+# Imported in the same order as server.py pulls them in
+PROFILED_MODULES = [
+    "dotenv",
+    "pydantic",
+    "starlette",
+    "fastapi",
+    "pymongo",
+    "motor.motor_asyncio",
+    "jwt",
+    "passlib.context",
+    "server",
+]
+
+# Only needed on first use (XLSX import, image upload); should not be loaded at startup
+LAZY_MODULES = ["pandas", "numpy", "openpyxl", "PIL"]
+
+
+def rss_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is a peak value (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def profile_imports(modules):
+    rows = []
+    for name in modules:
+        already_loaded = name in sys.modules
+        rss_before = rss_bytes()
+        started = time.perf_counter()
+        importlib.import_module(name)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        rows.append((name, elapsed_ms, rss_bytes() - rss_before, already_loaded))
+    return rows
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    modules = PROFILED_MODULES + sys.argv[1:]
+
+    process_started = time.perf_counter()
+    baseline_rss = rss_bytes()
+    rows = profile_imports(modules)
+    total_ms = (time.perf_counter() - process_started) * 1000
+
+    print(f"{'module':<24}{'import ms':>12}{'RSS +MiB':>12}")
+    print("-" * 48)
+    for name, elapsed_ms, rss_delta, already_loaded in rows:
+        note = "  (already loaded)" if already_loaded else ""
+        print(f"{name:<24}{elapsed_ms:>12.1f}{rss_delta / 2**20:>12.1f}{note}")
+    print("-" * 48)
+    print(f"{'total':<24}{total_ms:>12.1f}{(rss_bytes() - baseline_rss) / 2**20:>12.1f}")
+    print(f"final RSS: {rss_bytes() / 2**20:.1f} MiB")
+
+    eager = [name for name in LAZY_MODULES if name in sys.modules]
+    if eager:
+        print(f"❌ Lazy modules loaded at startup: {', '.join(eager)}")
+        return 1
+    print(f"✅ Lazy modules not loaded at startup: {', '.join(LAZY_MODULES)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -154,7 +154,42 @@ class EnhancedRestaurantTester:
                     self.log_test("PUT /api/menu/{item_id} (admin only)", False, f"HTTP {response.status_code}: {response.text}")
             except Exception as e:
                 self.log_test("PUT /api/menu/{item_id} (admin only)", False, f"Request failed: {str(e)}")
-                
+
+        # Test 2b: POST /api/menu/bulk (admin only - many partial updates in one request)
+        if "administrator" in self.tokens and self.created_menu_item_id:
+            try:
+                self.set_auth_header("administrator")
+                missing_id = str(uuid.uuid4())
+                bulk_data = {"items": [
+                    {"id": self.created_menu_item_id, "price": 19.49, "on_stop_list": True},
+                    {"id": missing_id, "price": 1.0}
+                ]}
+                response = self.session.post(f"{BACKEND_URL}/menu/bulk", json=bulk_data)
+
+                if response.status_code == 200:
+                    result = response.json()
+                    statuses = {r["id"]: r["status"] for r in result["results"]}
+                    item_response = self.session.get(f"{BACKEND_URL}/menu/all")
+                    item = next((i for i in item_response.json() if i["id"] == self.created_menu_item_id), None)
+                    if (statuses.get(self.created_menu_item_id) == "updated" and statuses.get(missing_id) == "not_found"
+                            and result["updated"] == 1 and result["failed"] == 1
+                            and item and item["price"] == 19.49 and item["on_stop_list"]):
+                        self.log_test("POST /api/menu/bulk (admin only)", True, f"Bulk update applied at menu version {result['version']}")
+                    else:
+                        self.log_test("POST /api/menu/bulk (admin only)", False, f"Unexpected result: {result}")
+                else:
+                    self.log_test("POST /api/menu/bulk (admin only)", False, f"HTTP {response.status_code}: {response.text}")
+
+                if "waitress" in self.tokens:
+                    self.set_auth_header("waitress")
+                    response = self.session.post(f"{BACKEND_URL}/menu/bulk", json=bulk_data)
+                    if response.status_code == 403:
+                        self.log_test("POST /api/menu/bulk (waitress denied)", True, "Waitress correctly denied bulk updates")
+                    else:
+                        self.log_test("POST /api/menu/bulk (waitress denied)", False, f"Expected 403, got {response.status_code}")
+            except Exception as e:
+                self.log_test("POST /api/menu/bulk (admin only)", False, f"Request failed: {str(e)}")
+
         # Test 3: DELETE /api/menu/{item_id} (admin only - delete menu item)
         if "administrator" in self.tokens and self.created_menu_item_id:
             try:
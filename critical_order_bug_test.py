@@ -7,6 +7,7 @@ Tests the specific fix for 500 Internal Server Error on order endpoints due to O
 import requests
 import json
 import sys
+import uuid
 from datetime import datetime
 
 # Backend URL from frontend/.env
@@ -164,6 +165,47 @@ class CriticalOrderBugTester:
         except Exception as e:
             self.log_test("POST /api/orders (waitress)", False, f"Request failed: {str(e)}")
     
+    def test_post_orders_idempotency_key(self):
+        """Test that retried POST /api/orders with the same Idempotency-Key creates one order"""
+        print("\n=== TESTING POST /api/orders IDEMPOTENCY-KEY RETRIES ===")
+        
+        if "waitress" not in self.tokens or not self.menu_items:
+            self.log_test("POST /api/orders (Idempotency-Key)", False, "Waitress token or menu items missing")
+            return
+        
+        try:
+            self.set_auth_header("waitress")
+            item = next(i for i in self.menu_items if i["available"] and not i["on_stop_list"])
+            order_data = {
+                "customer_name": "Idempotency Test",
+                "table_number": 13,
+                "items": [{"menu_item_id": item["id"], "quantity": 1, "price": item["price"]}],
+                "total": item["price"],
+                "status": "pending",
+                "notes": "Idempotency-Key retry test"
+            }
+            headers = {"Idempotency-Key": str(uuid.uuid4())}
+            
+            first = self.session.post(f"{BACKEND_URL}/orders", json=order_data, headers=headers)
+            retry = self.session.post(f"{BACKEND_URL}/orders", json=order_data, headers=headers)
+            if first.status_code == 200 and retry.status_code == 200 and first.json()["order_id"] == retry.json()["order_id"]:
+                self.log_test("POST /api/orders (Idempotency-Key retry)", True,
+                            f"Retry returned the original order {first.json()['order_id']}"
+                            f" (Idempotent-Replayed: {retry.headers.get('Idempotent-Replayed')})")
+            else:
+                self.log_test("POST /api/orders (Idempotency-Key retry)", False,
+                            f"HTTP {first.status_code}/{retry.status_code}: {first.text} / {retry.text}")
+            
+            changed = dict(order_data, table_number=14)
+            response = self.session.post(f"{BACKEND_URL}/orders", json=changed, headers=headers)
+            if response.status_code == 422:
+                self.log_test("POST /api/orders (Idempotency-Key reuse)", True, "Key reused for a different order rejected")
+            else:
+                self.log_test("POST /api/orders (Idempotency-Key reuse)", False, f"Expected 422, got {response.status_code}")
+                
+        except Exception as e:
+            self.log_test("POST /api/orders (Idempotency-Key)", False, f"Request failed: {str(e)}")
+    
     def test_get_orders_all_roles(self):
         """Test GET /api/orders endpoint with all roles - verify no 500 errors"""
         print("\n=== TESTING GET /api/orders WITH ALL ROLES ===")
@@ -356,6 +398,7 @@ class CriticalOrderBugTester:
         
         # Step 2: Test POST /api/orders endpoint with waitress account
         self.test_post_orders_waitress()
+        self.test_post_orders_idempotency_key()
         
         # Step 3: Test GET /api/orders endpoint with all roles
         self.test_get_orders_all_roles()
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import "./App.css";
 import axios from "axios";
 
@@ -215,6 +215,8 @@ const WaitressInterface = () => {
   // Новые состояния для "Мои заказы"
   const [activeTab, setActiveTab] = useState("new_order"); // "new_order" или "my_orders"
   const [myOrders, setMyOrders] = useState([]);
+  // Idempotency-Key текущего заказа: повторная отправка не создаст дубликат на кухне
+  const orderKeyRef = useRef(null);
 
   useEffect(() => {
     setWelcomePhrase(getRandomPhrase(WELCOME_PHRASES));
@@ -225,6 +227,36 @@ const WaitressInterface = () => {
     }
   }, [activeTab]);
 
+  // Стоп-лист и доступность блюд приходят по WebSocket сразу после изменения
+  useEffect(() => {
+    let socket = null;
+    let reconnectTimer = null;
+    let closed = false;
+
+    const connect = () => {
+      const token = localStorage.getItem("token");
+      if (!token) return;
+      socket = new WebSocket(`${API.replace(/^http/, "ws")}/ws/menu?token=${encodeURIComponent(token)}`);
+      socket.onopen = () => fetchMenu(); // догоняем изменения, пропущенные без соединения
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type !== "availability") return;
+        const changes = Object.fromEntries(message.items.map(item => [item.id, item]));
+        setMenu(prevMenu => prevMenu.map(item => changes[item.id] ? { ...item, ...changes[item.id] } : item));
+      };
+      socket.onclose = () => {
+        if (!closed) reconnectTimer = setTimeout(connect, 5000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      if (socket) socket.close();
+    };
+  }, []);
+
   const fetchMyOrders = async () => {
     try {
       const response = await axios.get(`${API}/orders`);
@@ -434,7 +466,21 @@ const WaitressInterface = () => {
         notes: orderNotes
       };
 
-      await axios.post(`${API}/orders`, orderData);
+      if (!orderKeyRef.current) {
+        orderKeyRef.current = window.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+      }
+      const headers = { "Idempotency-Key": orderKeyRef.current };
+      // Без ответа сервера (обрыв Wi-Fi) повторяем с тем же ключом
+      for (let attempt = 1; ; attempt++) {
+        try {
+          await axios.post(`${API}/orders`, orderData, { headers });
+          break;
+        } catch (error) {
+          if (error.response || attempt >= 3) throw error;
+          await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+        }
+      }
+      orderKeyRef.current = null;
       
       // Send notifications to kitchen, bar, and admin about new order
       const hasFood = allItems.some(item => item.item_type === 'food');
@@ -471,7 +517,21 @@ const WaitressInterface = () => {
       setActiveStep("success");
       
     } catch (error) {
-      alert("Ошибка при отправке заказа: " + (error.response?.data?.detail || error.message));
+      const status = error.response?.status;
+      if (status && status < 500 && status !== 409) {
+        orderKeyRef.current = null; // заказ отклонён, следующая отправка — новый заказ
+      }
+      const detail = error.response?.data?.detail;
+      if (detail?.unavailable_items || detail?.unknown_items) {
+        const lines = [
+          ...(detail.unavailable_items || []).map(item => `• ${item.name} — нет в наличии`),
+          ...(detail.unknown_items || []).map(id => `• ${id} — нет в меню`)
+        ];
+        alert("Заказ не отправлен, уберите позиции:\n" + lines.join("\n"));
+        fetchMenu();
+      } else {
+        alert("Ошибка при отправке заказа: " + (detail || error.message));
+      }
     } finally {
       setLoading(false);
     }
@@ -976,33 +1036,75 @@ const WaitressInterface = () => {
   return null;
 };
 
-// Kitchen Interface - полный функционал
-const KitchenInterface = () => {
-  const { user } = React.useContext(AuthContext);
+// Очередь кухни или бара по WebSocket: снимок при подключении, затем события по заказам.
+// При переподключении сервер досылает только пропущенные события (?since=<последний seq>).
+const useStationQueue = (station) => {
   const [orders, setOrders] = useState([]);
-  const [loading, setLoading] = useState(false);
 
   useEffect(() => {
-    fetchKitchenOrders();
-    const interval = setInterval(fetchKitchenOrders, 30000);
-    return () => clearInterval(interval);
-  }, []);
+    let socket = null;
+    let reconnectTimer = null;
+    let closed = false;
+    let lastSeq = null;
+    // Последняя известная ревизия каждого заказа: события, пришедшие не по порядку, отбрасываются
+    let revisions = {};
+
+    const isStale = (orderId, revision) => revisions[orderId] !== undefined && revision < revisions[orderId];
+
+    const applyMessage = (message) => {
+      if (message.type === "snapshot") {
+        revisions = Object.fromEntries(message.orders.map(order => [order.id, order.revision || 0]));
+        setOrders(message.orders);
+      } else if (message.type === "order_added" || message.type === "order_updated") {
+        const order = message.order;
+        if (isStale(order.id, order.revision || 0)) return;
+        revisions[order.id] = order.revision || 0;
+        setOrders(prevOrders => prevOrders.some(o => o.id === order.id)
+          ? prevOrders.map(o => o.id === order.id ? order : o)
+          : [...prevOrders, order]);
+      } else if (message.type === "order_removed") {
+        if (isStale(message.order_id, message.revision)) return;
+        revisions[message.order_id] = message.revision;
+        setOrders(prevOrders => prevOrders.filter(o => o.id !== message.order_id));
+      }
+    };
 
-  const fetchKitchenOrders = async () => {
-    try {
-      const response = await axios.get(`${API}/orders/kitchen`);
-      setOrders(Array.isArray(response.data) ? response.data : []);
-    } catch (error) {
-      console.error("Ошибка загрузки заказов кухни:", error);
-      setOrders([]);
-    }
-  };
+    const connect = () => {
+      const token = localStorage.getItem("token");
+      if (!token) return;
+      const since = lastSeq === null ? "" : `&since=${lastSeq}`;
+      socket = new WebSocket(`${API.replace(/^http/, "ws")}/ws/orders/${station}?token=${encodeURIComponent(token)}${since}`);
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.seq !== undefined) lastSeq = Math.max(lastSeq ?? 0, message.seq);
+        applyMessage(message);
+      };
+      socket.onclose = () => {
+        if (!closed) reconnectTimer = setTimeout(connect, 5000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      if (socket) socket.close();
+    };
+  }, [station]);
+
+  return orders;
+};
+
+// Kitchen Interface - полный функционал
+const KitchenInterface = () => {
+  const { user } = React.useContext(AuthContext);
+  const orders = useStationQueue("kitchen");
+  const [loading, setLoading] = useState(false);
 
   const updateOrderStatus = async (orderId, newStatus) => {
     setLoading(true);
     try {
       await axios.put(`${API}/orders/${orderId}`, { status: newStatus });
-      fetchKitchenOrders();
       
       // Send notification when order is ready
       if (newStatus === 'ready') {
@@ -1132,30 +1234,13 @@ const KitchenInterface = () => {
 // Bar Interface - полный функционал
 const BarInterface = () => {
   const { user } = React.useContext(AuthContext);
-  const [orders, setOrders] = useState([]);
+  const orders = useStationQueue("bar");
   const [loading, setLoading] = useState(false);
 
-  useEffect(() => {
-    fetchBarOrders();
-    const interval = setInterval(fetchBarOrders, 30000);
-    return () => clearInterval(interval);
-  }, []);
-
-  const fetchBarOrders = async () => {
-    try {
-      const response = await axios.get(`${API}/orders/bar`);
-      setOrders(Array.isArray(response.data) ? response.data : []);
-    } catch (error) {
-      console.error("Ошибка загрузки заказов бара:", error);
-      setOrders([]);
-    }
-  };
-
   const updateOrderStatus = async (orderId, newStatus) => {
     setLoading(true);
     try {
       await axios.put(`${API}/orders/${orderId}`, { status: newStatus });
-      fetchBarOrders();
       
       // Send notification when drink order is ready
       if (newStatus === 'ready') {
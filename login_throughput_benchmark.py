@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Login Throughput Benchmark
+Fires concurrent logins (shift change) while polling a cheap authenticated route,
+to show that bcrypt no longer stalls the event loop for other requests.
+"""
+
+import requests
+import os
+import sys
+import time
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Backend URL from frontend/.env (override with BACKEND_URL for a local server)
+BACKEND_URL = os.environ.get("BACKEND_URL", "https://7ac04967-575d-4814-81b1-48f03205e31d.preview.emergentagent.com/api")
+
+LOGIN_USERS = [
+    {"username": "waitress1", "password": "password123"},
+    {"username": "kitchen1", "password": "password123"},
+    {"username": "bartender1", "password": "password123"},
+    {"username": "admin1", "password": "password123"}
+]
+
+class LoginThroughputBenchmark:
+    def __init__(self, concurrency=16, duration=10.0):
+        self.concurrency = concurrency
+        self.duration = duration
+        self.token = None
+
+    def authenticate(self):
+        """Get a token for polling the probe route"""
+        response = requests.post(f"{BACKEND_URL}/auth/login", json=LOGIN_USERS[0])
+        if response.status_code != 200:
+            print(f"❌ FAIL Authentication: HTTP {response.status_code}: {response.text}")
+            return False
+        self.token = response.json()["access_token"]
+        return True
+
+    def probe_latencies(self, stop_event):
+        """Poll GET /tables until stopped and return the observed latencies in ms"""
+        session = requests.Session()
+        session.headers.update({"Authorization": f"Bearer {self.token}"})
+        latencies = []
+        while not stop_event.is_set():
+            started = time.perf_counter()
+            response = session.get(f"{BACKEND_URL}/tables")
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.05)
+        return latencies
+
+    def login_worker(self, worker_index, deadline):
+        """Log in repeatedly until the deadline; return (ok, rejected, failed) counts"""
+        session = requests.Session()
+        credentials = LOGIN_USERS[worker_index % len(LOGIN_USERS)]
+        ok = rejected = failed = 0
+        while time.perf_counter() < deadline:
+            response = session.post(f"{BACKEND_URL}/auth/login", json=credentials)
+            if response.status_code == 200:
+                ok += 1
+            elif response.status_code == 503:
+                rejected += 1
+            else:
+                failed += 1
+        return ok, rejected, failed
+
+    def measure_probe(self, seconds):
+        stop_event = threading.Event()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(self.probe_latencies, stop_event)
+            time.sleep(seconds)
+            stop_event.set()
+            return future.result()
+
+    @staticmethod
+    def summarize(label, latencies):
+        if not latencies:
+            print(f"   {label}: no successful probe requests")
+            return
+        ordered = sorted(latencies)
+        p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+        print(f"   {label}: n={len(ordered)} p50={statistics.median(ordered):.1f}ms "
+              f"p95={p95:.1f}ms max={ordered[-1]:.1f}ms")
+
+    def run(self):
+        print("🚀 STARTING LOGIN THROUGHPUT BENCHMARK")
+        print("=" * 80)
+        if not self.authenticate():
+            return False
+
+        print(f"\n=== BASELINE: /tables latency without logins ({self.duration:.0f}s) ===")
+        baseline = self.measure_probe(self.duration)
+        self.summarize("GET /tables", baseline)
+
+        print(f"\n=== LOAD: {self.concurrency} concurrent login loops ({self.duration:.0f}s) ===")
+        stop_event = threading.Event()
+        deadline = time.perf_counter() + self.duration
+        with ThreadPoolExecutor(max_workers=self.concurrency + 1) as pool:
+            probe = pool.submit(self.probe_latencies, stop_event)
+            workers = [pool.submit(self.login_worker, i, deadline) for i in range(self.concurrency)]
+            counts = [worker.result() for worker in workers]
+            stop_event.set()
+            under_load = probe.result()
+
+        ok = sum(c[0] for c in counts)
+        rejected = sum(c[1] for c in counts)
+        failed = sum(c[2] for c in counts)
+        print(f"   Logins: ok={ok} ({ok / self.duration:.1f}/s) rejected_503={rejected} failed={failed}")
+        self.summarize("GET /tables", under_load)
+
+        print("\n" + "=" * 80)
+        if not under_load:
+            print("❌ FAIL: the event loop served no other requests while logins were running")
+            return False
+        print("✅ PASS: other routes kept being served while logins were in progress")
+        return failed == 0
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    benchmark = LoginThroughputBenchmark(concurrency=concurrency, duration=duration)
+    sys.exit(0 if benchmark.run() else 1)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Menu Image Processing Test
+Runs process_menu_image (the work behind POST /menu/{item_id}/image) on valid photos
+and on hostile uploads: a tiny PNG declaring 15000x13000 pixels (a decompression bomb),
+an image just over MENU_IMAGE_MAX_PIXELS, an unsupported format and a non-image.
+Every hostile upload must be rejected with ValueError, which the endpoint turns into a 400.
+Runs offline against a temporary image directory; no database or server needed.
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+IMAGE_DIR = tempfile.mkdtemp(prefix="menu_image_test_")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "menu_image_test")
+os.environ["MENU_IMAGE_DIR"] = IMAGE_DIR
+
+from PIL import Image  # noqa: E402
+
+import server  # noqa: E402
+
+def encode(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+class MenuImageTester:
+    def __init__(self):
+        self.test_results = []
+
+    def log_test(self, test_name, success, message):
+        """Log test results"""
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} {test_name}: {message}")
+        self.test_results.append({"test": test_name, "success": success, "message": message})
+
+    def expect_accepted(self, test_name, data):
+        try:
+            images = server.process_menu_image(data)
+        except Exception as e:
+            self.log_test(test_name, False, f"raised {type(e).__name__}: {e}")
+            return
+        files = [url.rsplit("/", 1)[1] for size in server.MENU_IMAGE_SIZES for url in images[size].values()]
+        missing = [name for name in files if not os.path.exists(os.path.join(IMAGE_DIR, name))]
+        if missing:
+            self.log_test(test_name, False, f"thumbnails not written: {missing}")
+        else:
+            self.log_test(test_name, True, f"{images['width']}x{images['height']}, {len(files)} thumbnails")
+
+    def expect_rejected(self, test_name, data):
+        """Hostile uploads must raise ValueError (HTTP 400), never anything that becomes a 500"""
+        try:
+            server.process_menu_image(data)
+        except ValueError as e:
+            self.log_test(test_name, True, f"rejected ({len(data)} bytes): {e}")
+        except Exception as e:
+            self.log_test(test_name, False, f"raised {type(e).__name__} instead of ValueError: {e}")
+        else:
+            self.log_test(test_name, False, "accepted")
+
+    def run_all_tests(self):
+        print("🚀 STARTING MENU IMAGE PROCESSING TEST")
+        print("=" * 80)
+        photo = Image.new("RGB", (1600, 1200), (200, 80, 40))
+        self.expect_accepted("JPEG photo", encode(photo, "JPEG", quality=90))
+        self.expect_accepted("PNG photo", encode(photo, "PNG"))
+
+        # A few KB on the wire, 195 megapixels once decoded
+        self.expect_rejected("Decompression bomb PNG (15000x13000)", encode(Image.new("1", (15000, 13000)), "PNG"))
+        over_limit = int(server.MENU_IMAGE_MAX_PIXELS ** 0.5) + 1
+        self.expect_rejected(f"PNG over MENU_IMAGE_MAX_PIXELS ({over_limit}x{over_limit})",
+                             encode(Image.new("1", (over_limit, over_limit)), "PNG"))
+        self.expect_rejected("GIF image", encode(Image.new("RGB", (64, 64)), "GIF"))
+        self.expect_rejected("Not an image", b"definitely not an image" * 100)
+
+        failed_tests = [test for test in self.test_results if not test["success"]]
+        print("\n" + "=" * 80)
+        print(f"✅ PASSED: {len(self.test_results) - len(failed_tests)}")
+        print(f"❌ FAILED: {len(failed_tests)}")
+        for test in failed_tests:
+            print(f"   ❌ {test['test']}: {test['message']}")
+        return len(failed_tests) == 0
+
+if __name__ == "__main__":
+    tester = MenuImageTester()
+    sys.exit(0 if tester.run_all_tests() else 1)
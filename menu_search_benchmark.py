@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Menu Search Benchmark
+Builds MenuSearchIndex over a synthetic 12,000-item catalog (a third of it wines, most
+names and descriptions sharing common words) and times GET /menu/search lookups,
+including broad queries that match thousands of items. Results are checked against a
+brute-force scan, and the run fails when any query's p95 exceeds the target.
+Runs offline; no database or server needed.
+"""
+
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "menu_search_benchmark")
+
+import server  # noqa: E402
+
+TARGET_P95_MS = 1.0
+LIMIT = 20
+QUERIES = [
+    "wine", "red wine", "ch", "c", "chardonnay reserve", "white wine chilled", "борщ", "суп д",
+    "Chicken Caesar", "sparkling", "ё", "champagnecocktailspecial", "zzz",
+    # Large posting lists that rarely intersect
+    "wine борщ", "chef wine salmon", "с merlot", "домашний chicken tiramisu",
+]
+
+WINE_WORDS = ["red", "white", "rose", "sparkling", "dry", "semi-sweet", "chilled", "house"]
+GRAPES = ["Chardonnay", "Merlot", "Cabernet", "Pinot Noir", "Riesling", "Chenin Blanc", "Shiraz", "Malbec"]
+DISHES = ["Chicken", "Cheese", "Chocolate", "Cherry", "Chili", "Beef", "Salmon", "Mushroom", "Caesar", "Tiramisu"]
+RUSSIAN = ["Борщ", "Суп дня", "Пельмени", "Блины", "Щи", "Солянка", "Ёрш", "Чебурек", "Шашлык"]
+DESCRIPTION_WORDS = ["chef", "choice", "classic", "with", "fresh", "herbs", "served", "cheese", "sauce", "домашний"]
+
+def build_catalog(count, rng):
+    items = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            name = f"{rng.choice(GRAPES)} {rng.choice(WINE_WORDS)} wine {rng.choice(['Reserve', 'Classic', ''])} {i}"
+        elif kind == 1:
+            name = f"{rng.choice(DISHES)} {rng.choice(DISHES).lower()} {i}"
+        else:
+            name = f"{rng.choice(RUSSIAN)} {rng.choice(DISHES)} {i}"
+        description = " ".join(rng.choice(DESCRIPTION_WORDS) for _ in range(8))
+        items.append({"id": str(uuid.uuid4()), "name": " ".join(name.split()), "description": description})
+    return items
+
+class FakeSnapshot:
+    """Only the attribute MenuSearchIndex.sync reads"""
+    def __init__(self, menu):
+        self.menu = menu
+
+def reference_search(items, query, limit):
+    """Brute-force scan with the index's match and ranking rules"""
+    folded_query = server.fold_search_text(query).strip()
+    tokens = server.SEARCH_TOKEN_RE.findall(folded_query)
+    if not tokens:
+        return [], 0
+    ranked = []
+    for item in items:
+        name = server.fold_search_text(item["name"])
+        description = server.fold_search_text(item["description"] or "")
+        name_words = server.SEARCH_TOKEN_RE.findall(name)
+        all_words = name_words + server.SEARCH_TOKEN_RE.findall(description)
+        if name.startswith(folded_query):
+            tier = 0
+        elif all(any(word.startswith(token) for word in name_words) for token in tokens):
+            tier = 1
+        elif all(any(word.startswith(token) for word in all_words) for token in tokens):
+            tier = 2
+        else:
+            continue
+        ranked.append((tier, name, item["id"]))
+    ranked.sort()
+    return [item_id for _, _, item_id in ranked[:limit]], len(ranked)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"🚀 MENU SEARCH BENCHMARK ({count} items, {iterations} iterations, limit {LIMIT})")
+    print("=" * 80)
+
+    rng = random.Random(42)
+    items = build_catalog(count, rng)
+    index = server.MenuSearchIndex()
+    started = time.perf_counter()
+    index.sync(FakeSnapshot(items))
+    print(f"   full build: {(time.perf_counter() - started) * 1000:.0f} ms, {index.stats()['prefixes']} prefixes")
+
+    # Incremental sync: rename a handful of items
+    changed = [dict(item) for item in items]
+    for item in rng.sample(changed, 10):
+        item["name"] = f"Chef special {item['id'][:6]}"
+    started = time.perf_counter()
+    index.sync(FakeSnapshot(changed))
+    print(f"   incremental sync (10 renamed): {(time.perf_counter() - started) * 1000:.1f} ms")
+    items = changed
+
+    failures = []
+    print(f"\n   {'query':<28}{'matches':>9}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    print("   " + "-" * 65)
+    for query in QUERIES:
+        expected, total_matches = reference_search(items, query, LIMIT)
+        if index.search(query, LIMIT) != expected:
+            failures.append(f"{query!r}: results differ from the brute-force scan")
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            index.search(query, LIMIT)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        print(f"   {query:<28}{total_matches:>9}{timings[len(timings) // 2]:>10.3f}{p95:>10.3f}{timings[-1]:>10.3f}")
+        if p95 > TARGET_P95_MS:
+            failures.append(f"{query!r}: p95 {p95:.3f} ms exceeds {TARGET_P95_MS} ms")
+
+    print("\n" + "=" * 80)
+    for failure in failures:
+        print(f"❌ FAIL {failure}")
+    if failures:
+        return False
+    print(f"✅ PASS: every query matches the brute-force results with p95 under {TARGET_P95_MS} ms")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Order Creation Benchmark
+Measures POST /orders latency against the number of line items, to show that
+create_order resolves all items with one menu query instead of one per item.
+Benchmark orders are marked served afterwards so they leave the kitchen and bar queues.
+"""
+
+import requests
+import os
+import sys
+import time
+import statistics
+
+# Backend URL from frontend/.env (override with BACKEND_URL for a local server)
+BACKEND_URL = os.environ.get("BACKEND_URL", "https://7ac04967-575d-4814-81b1-48f03205e31d.preview.emergentagent.com/api")
+
+WAITRESS = {"username": "waitress1", "password": "password123"}
+ORDER_SIZES = [1, 3, 6, 12, 24, 48]
+
+class OrderCreationBenchmark:
+    def __init__(self, iterations=20):
+        self.iterations = iterations
+        self.session = requests.Session()
+        self.menu_items = []
+        self.created_order_ids = []
+
+    def authenticate(self):
+        response = self.session.post(f"{BACKEND_URL}/auth/login", json=WAITRESS)
+        if response.status_code != 200:
+            print(f"❌ FAIL Authentication: HTTP {response.status_code}: {response.text}")
+            return False
+        self.session.headers.update({"Authorization": f"Bearer {response.json()['access_token']}"})
+        return True
+
+    def load_menu(self):
+        """Orderable items only; stop-listed items would be rejected"""
+        response = self.session.get(f"{BACKEND_URL}/menu")
+        if response.status_code != 200:
+            print(f"❌ FAIL GET /menu: HTTP {response.status_code}")
+            return False
+        self.menu_items = [item for item in response.json() if item["available"] and not item["on_stop_list"]]
+        if not self.menu_items:
+            print("❌ FAIL: no orderable menu items")
+            return False
+        return True
+
+    def build_order(self, size):
+        items = []
+        for i in range(size):
+            menu_item = self.menu_items[i % len(self.menu_items)]
+            items.append({"menu_item_id": menu_item["id"], "quantity": 1, "price": menu_item["price"]})
+        return {
+            "customer_name": "Benchmark", "table_number": 1, "items": items,
+            "total": round(sum(item["price"] for item in items), 2), "notes": "order_creation_benchmark"
+        }
+
+    def measure(self, size):
+        order = self.build_order(size)
+        latencies = []
+        for _ in range(self.iterations):
+            started = time.perf_counter()
+            response = self.session.post(f"{BACKEND_URL}/orders", json=order)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                print(f"❌ FAIL POST /orders ({size} items): HTTP {response.status_code}: {response.text}")
+                return None
+            latencies.append(elapsed_ms)
+            self.created_order_ids.append(response.json()["order_id"])
+        return latencies
+
+    def cleanup(self):
+        for order_id in self.created_order_ids:
+            self.session.put(f"{BACKEND_URL}/orders/{order_id}", json={"status": "served"})
+
+    def run(self):
+        print("🚀 STARTING ORDER CREATION BENCHMARK")
+        print("=" * 80)
+        if not self.authenticate() or not self.load_menu():
+            return False
+
+        results = {}
+        try:
+            print(f"\n{'items':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+            print("-" * 36)
+            for size in ORDER_SIZES:
+                latencies = self.measure(size)
+                if latencies is None:
+                    return False
+                ordered = sorted(latencies)
+                p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+                results[size] = statistics.median(ordered)
+                print(f"{size:>6}{results[size]:>10.1f}{p95:>10.1f}{ordered[-1]:>10.1f}")
+        finally:
+            self.cleanup()
+
+        print("\n" + "=" * 80)
+        smallest, largest = ORDER_SIZES[0], ORDER_SIZES[-1]
+        growth = results[largest] / results[smallest]
+        print(f"p50 latency grows {growth:.2f}x from {smallest} to {largest} items")
+        if growth > 2:
+            print("❌ FAIL: latency still grows with the number of line items")
+            return False
+        print("✅ PASS: order creation latency is flat in the number of line items")
+        return True
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    benchmark = OrderCreationBenchmark(iterations=iterations)
+    sys.exit(0 if benchmark.run() else 1)
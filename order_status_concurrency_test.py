@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Order Status Concurrency Test
+Fires kitchen and bar status updates for the same mixed (food + drink) orders at the
+same moment and checks the combined order status, which update_order_status now
+derives inside one atomic find_one_and_update. With the old read-then-write code one
+station's update could overwrite the other's view and leave orders stuck in "preparing".
+"""
+
+import requests
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Backend URL from frontend/.env (override with BACKEND_URL for a local server)
+BACKEND_URL = os.environ.get("BACKEND_URL", "https://7ac04967-575d-4814-81b1-48f03205e31d.preview.emergentagent.com/api")
+
+USERS = {
+    "waitress": {"username": "waitress1", "password": "password123"},
+    "kitchen": {"username": "kitchen1", "password": "password123"},
+    "bartender": {"username": "bartender1", "password": "password123"},
+    "administrator": {"username": "admin1", "password": "password123"},
+}
+
+class OrderStatusConcurrencyTester:
+    def __init__(self, orders=20):
+        self.orders = orders
+        self.tokens = {}
+        self.test_results = []
+        self.food_item = None
+        self.drink_item = None
+        self.order_ids = []
+
+    def log_test(self, test_name, success, message):
+        """Log test results"""
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} {test_name}: {message}")
+        self.test_results.append({"test": test_name, "success": success, "message": message})
+
+    def headers(self, role):
+        return {"Authorization": f"Bearer {self.tokens[role]}"}
+
+    def authenticate(self):
+        for role, credentials in USERS.items():
+            response = requests.post(f"{BACKEND_URL}/auth/login", json=credentials)
+            if response.status_code != 200:
+                self.log_test(f"Authentication {credentials['username']}", False, f"HTTP {response.status_code}")
+                return False
+            self.tokens[role] = response.json()["access_token"]
+        self.log_test("Authentication", True, f"{len(self.tokens)} roles logged in")
+        return True
+
+    def load_menu(self):
+        """One orderable food item and one orderable drink"""
+        response = requests.get(f"{BACKEND_URL}/menu", headers=self.headers("waitress"))
+        if response.status_code != 200:
+            self.log_test("Load menu", False, f"HTTP {response.status_code}")
+            return False
+        orderable = [item for item in response.json() if item["available"] and not item["on_stop_list"]]
+        self.food_item = next((item for item in orderable if item["item_type"] == "food"), None)
+        self.drink_item = next((item for item in orderable if item["item_type"] == "drink"), None)
+        if not self.food_item or not self.drink_item:
+            self.log_test("Load menu", False, "need at least one orderable food item and one drink")
+            return False
+        return True
+
+    def create_mixed_orders(self):
+        for i in range(self.orders):
+            items = [
+                {"menu_item_id": self.food_item["id"], "quantity": 1, "price": self.food_item["price"]},
+                {"menu_item_id": self.drink_item["id"], "quantity": 1, "price": self.drink_item["price"]},
+            ]
+            order = {
+                "customer_name": "Concurrency", "table_number": (i % 28) + 1, "items": items,
+                "total": round(self.food_item["price"] + self.drink_item["price"], 2),
+                "notes": "order_status_concurrency_test"
+            }
+            response = requests.post(f"{BACKEND_URL}/orders", json=order, headers=self.headers("waitress"))
+            if response.status_code != 200:
+                self.log_test("Create mixed orders", False, f"HTTP {response.status_code}: {response.text}")
+                return False
+            self.order_ids.append(response.json()["order_id"])
+        self.log_test("Create mixed orders", True, f"{len(self.order_ids)} food + drink orders")
+        return True
+
+    def update_simultaneously(self, order_id, new_status):
+        """Send the kitchen and bar updates for one order at the same instant"""
+        barrier = threading.Barrier(2)
+
+        def update(role):
+            barrier.wait()
+            return requests.put(f"{BACKEND_URL}/orders/{order_id}", json={"status": new_status},
+                                headers=self.headers(role)).status_code
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            return list(pool.map(update, ["kitchen", "bartender"]))
+
+    def fetch_orders(self):
+        response = requests.get(f"{BACKEND_URL}/orders", headers=self.headers("administrator"))
+        return {order["id"]: order for order in response.json() if order["id"] in self.order_ids}
+
+    def test_round(self, new_status):
+        """Every order must end up with both station statuses and the overall status at new_status"""
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            codes = list(pool.map(lambda order_id: self.update_simultaneously(order_id, new_status), self.order_ids))
+        failed_requests = [c for pair in codes for c in pair if c != 200]
+        if failed_requests:
+            self.log_test(f"Concurrent updates to {new_status}", False, f"non-200 responses: {failed_requests}")
+            return
+
+        orders = self.fetch_orders()
+        wrong = [
+            f"{order_id[-8:]}: status={order['status']} kitchen={order['kitchen_status']} bar={order['bar_status']}"
+            for order_id, order in orders.items()
+            if (order["status"], order["kitchen_status"], order["bar_status"]) != (new_status,) * 3
+        ]
+        if wrong or len(orders) != len(self.order_ids):
+            self.log_test(f"Concurrent updates to {new_status}", False,
+                          f"{len(wrong)} orders inconsistent, {len(orders)}/{len(self.order_ids)} found: {wrong[:5]}")
+        else:
+            self.log_test(f"Concurrent updates to {new_status}", True,
+                          f"all {len(orders)} mixed orders are {new_status}")
+
+    def test_unknown_order(self):
+        response = requests.put(f"{BACKEND_URL}/orders/does-not-exist", json={"status": "ready"},
+                                headers=self.headers("kitchen"))
+        self.log_test("Update unknown order", response.status_code == 404, f"HTTP {response.status_code}")
+
+    def cleanup(self):
+        for order_id in self.order_ids:
+            requests.put(f"{BACKEND_URL}/orders/{order_id}", json={"status": "served"},
+                         headers=self.headers("administrator"))
+
+    def run_all_tests(self):
+        print("🚀 STARTING ORDER STATUS CONCURRENCY TEST")
+        print("=" * 80)
+        if not self.authenticate() or not self.load_menu():
+            return False
+        try:
+            if self.create_mixed_orders():
+                self.test_round("ready")
+                self.test_round("served")
+            self.test_unknown_order()
+        finally:
+            self.cleanup()
+
+        failed_tests = [test for test in self.test_results if not test["success"]]
+        print("\n" + "=" * 80)
+        print(f"✅ PASSED: {len(self.test_results) - len(failed_tests)}")
+        print(f"❌ FAILED: {len(failed_tests)}")
+        for test in failed_tests:
+            print(f"   ❌ {test['test']}: {test['message']}")
+        return len(failed_tests) == 0
+
+if __name__ == "__main__":
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    tester = OrderStatusConcurrencyTester(orders=orders)
+    sys.exit(0 if tester.run_all_tests() else 1)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Query Plan Regression Test
+Seeds a scratch database on a local mongod with realistic restaurant data, applies the
+server's INDEX_REGISTRY and runs explain() on every query the hot endpoints issue.
+Fails when a plan falls back to a COLLSCAN or a blocking in-memory SORT.
+
+Requires a local mongod (MONGO_URL, default mongodb://localhost:27017).
+"""
+
+import os
+import sys
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+SCRATCH_DB_NAME = f"query_plan_test_{uuid.uuid4().hex[:8]}"
+
+# server.py reads these at import time; point it at the scratch database
+os.environ.setdefault("MONGO_URL", MONGO_URL)
+os.environ.setdefault("DB_NAME", SCRATCH_DB_NAME)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+import server  # noqa: E402
+
+# Plan stages that mean the query scans or sorts without an index
+FORBIDDEN_STAGES = {"COLLSCAN", "SORT", "$sort"}
+
+class QueryPlanTester:
+    def __init__(self):
+        self.client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=5000)
+        self.db = self.client[SCRATCH_DB_NAME]
+        self.test_results = []
+        self.waitress_ids = []
+        self.category_ids = []
+
+    def log_test(self, test_name, success, message):
+        """Log test results"""
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} {test_name}: {message}")
+        self.test_results.append({"test": test_name, "success": success, "message": message})
+
+    def seed_data(self, menu_items=1500, orders=20000):
+        """Insert realistic volumes of categories, users, menu items and orders"""
+        print(f"\n=== SEEDING {SCRATCH_DB_NAME} ===")
+        rng = random.Random(42)
+        now = datetime.utcnow()
+
+        categories = []
+        for i, (name, department) in enumerate([
+            ("appetizers", "kitchen"), ("main_dishes", "kitchen"), ("desserts", "kitchen"),
+            ("beverages", "bar"), ("cocktails", "bar"), ("wine", "bar")
+        ]):
+            categories.append(server.Category(
+                name=name, display_name=name.title(), emoji="🍽️", department=department,
+                sort_order=i + 1, is_active=i != 5
+            ).dict())
+        self.db.categories.insert_many(categories)
+        self.category_ids = [cat["id"] for cat in categories]
+
+        users = []
+        for i in range(30):
+            role = [server.UserRole.WAITRESS, server.UserRole.KITCHEN, server.UserRole.BARTENDER][i % 3]
+            users.append(server.User(
+                username=f"user{i}", password_hash="x", role=role, full_name=f"User {i}"
+            ).dict())
+        self.db.users.insert_many(users)
+        self.waitress_ids = [u["id"] for u in users if u["role"] == server.UserRole.WAITRESS]
+
+        items = []
+        for i in range(menu_items):
+            category = categories[i % len(categories)]
+            item_type = "drink" if category["department"] == "bar" else "food"
+            items.append(server.MenuItem(
+                name=f"Item {i:05d}", description=f"Description {i}", price=round(rng.uniform(2, 60), 2),
+                category_id=category["id"], item_type=item_type,
+                available=rng.random() > 0.1, on_stop_list=rng.random() < 0.05,
+                **server.category_fields(category)
+            ).dict())
+        self.db.menu_items.insert_many(items)
+
+        statuses = ["pending", "confirmed", "preparing", "ready", "served"]
+        weights = [2, 1, 2, 5, 90]
+        order_docs = []
+        for i in range(orders):
+            order_items = []
+            for _ in range(rng.randint(1, 8)):
+                item = items[rng.randrange(len(items))]
+                order_items.append({
+                    "menu_item_id": item["id"], "menu_item_name": item["name"], "quantity": rng.randint(1, 3),
+                    "price": item["price"], "item_type": item["item_type"]
+                })
+            has_food = any(it["item_type"] == "food" for it in order_items)
+            has_drinks = any(it["item_type"] == "drink" for it in order_items)
+            created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+            order_docs.append({
+                "id": str(uuid.uuid4()), "customer_name": "Guest", "table_number": rng.randint(1, 28),
+                "items": order_items, "total": sum(it["price"] * it["quantity"] for it in order_items),
+                "status": rng.choices(statuses, weights)[0], "notes": None,
+                "waitress_id": rng.choice(self.waitress_ids), "waitress_name": "Waitress",
+                "has_food_items": has_food, "has_drink_items": has_drinks,
+                "kitchen_status": "pending" if has_food else "ready",
+                "bar_status": "pending" if has_drinks else "ready",
+                "created_at": created_at, "updated_at": created_at
+            })
+        self.db.orders.insert_many(order_docs)
+
+        for collection_name, indexes in server.INDEX_REGISTRY.items():
+            self.db[collection_name].create_indexes(indexes)
+        print(f"Seeded {menu_items} menu items, {orders} orders, indexes from INDEX_REGISTRY applied")
+
+    @staticmethod
+    def plan_stages(node, stages=None):
+        """Collect every stage name in an explain() document, including pipeline stages"""
+        if stages is None:
+            stages = []
+        if isinstance(node, dict):
+            if isinstance(node.get("stage"), str):
+                stages.append(node["stage"])
+            # Lookups that re-scan the foreign collection for every document
+            if node.get("strategy") == "NestedLoopJoin":
+                stages.append("NestedLoopJoin")
+            for key, value in node.items():
+                if key.startswith("$") and key != "$cursor" and isinstance(value, dict):
+                    stages.append(key)
+                # Skip losing plans and the echoed command (its $sort may have been absorbed into an index scan)
+                if key in ("rejectedPlans", "allPlansExecution", "command", "originalCommand"):
+                    continue
+                QueryPlanTester.plan_stages(value, stages)
+        elif isinstance(node, list):
+            for value in node:
+                QueryPlanTester.plan_stages(value, stages)
+        return stages
+
+    def check_plan(self, name, explain):
+        stages = self.plan_stages(explain)
+        bad = sorted({stage for stage in stages if stage in FORBIDDEN_STAGES | {"NestedLoopJoin"}})
+        if bad:
+            self.log_test(name, False, f"plan uses {', '.join(bad)} (stages: {' > '.join(stages)})")
+        else:
+            self.log_test(name, True, " > ".join(stages))
+
+    def explain_find(self, name, collection, query, sort=None, projection=None, hint=None, min_key=None):
+        cursor = self.db[collection].find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if hint:
+            cursor = cursor.hint(hint)
+        if min_key:
+            cursor = cursor.min(min_key)
+        self.check_plan(name, cursor.explain())
+
+    def explain_aggregate(self, name, collection, pipeline):
+        explain = self.db.command("aggregate", collection, pipeline=pipeline, explain=True)
+        self.check_plan(name, explain)
+
+    def explain_count(self, name, collection, query):
+        explain = self.db.command("explain", {"count": collection, "query": query})
+        self.check_plan(name, explain)
+
+    def test_order_queries(self):
+        print("\n=== ORDER ENDPOINTS ===")
+        waitress_id = self.waitress_ids[0]
+        self.explain_find("get_orders (waitress)", "orders", {"waitress_id": waitress_id},
+                          [("created_at", -1)], {"_id": 0})
+        self.explain_find("get_orders (all)", "orders", {}, [("created_at", -1)], {"_id": 0})
+        self.explain_find("get_admin_orders (hours_back)", "orders",
+                          server.build_admin_orders_filter(24, None, None, False), [("created_at", -1)], {"_id": 0},
+                          server.ADMIN_ORDERS_INDEX)
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        week_ago = (datetime.utcnow() - timedelta(days=7)).strftime("%Y-%m-%d")
+        self.explain_find("get_admin_orders (date range, served)", "orders",
+                          server.build_admin_orders_filter(24, week_ago, today, True), [("created_at", -1)], {"_id": 0},
+                          server.ADMIN_ORDERS_INDEX)
+        self.explain_aggregate("get_kitchen_orders", "orders", server.station_queue_pipeline("food"))
+        self.explain_aggregate("get_bar_orders", "orders", server.station_queue_pipeline("drink"))
+        self.explain_find("get_orders_by_table", "orders", {"table_number": 7}, [("created_at", -1)], {"_id": 0})
+        self.explain_find("update_order_status lookup", "orders", {"id": "missing"})
+
+    def test_menu_queries(self):
+        print("\n=== MENU ENDPOINTS ===")
+        # The /menu and /categories read endpoints are all
+        # served from the in-process menu snapshot; these are the queries that build it
+        self.explain_find("menu snapshot items", "menu_items", {}, server.MENU_ITEM_SORT, {"_id": 0})
+        self.explain_find("menu snapshot categories", "categories", {}, [("sort_order", 1)], {"_id": 0})
+        changed_since = {"version": {"$gt": 10}}
+        self.explain_find("get_menu_changes items", "menu_items", changed_since, [("version", 1)], {"_id": 0})
+        self.explain_find("get_menu_changes categories", "categories", changed_since, [("version", 1)], {"_id": 0})
+        self.explain_find("get_menu_changes tombstones", "menu_tombstones", changed_since, [("version", 1)], {"_id": 0})
+        self.explain_find("prune_menu_tombstones", "menu_tombstones", {"deleted_at": {"$lt": datetime.utcnow()}},
+                          projection={"_id": 0, "version": 1})
+        after = (2, self.category_ids[1], "Item 00500", "x")
+        for active_only, endpoint in [(True, "get_menu"), (False, "get_all_menu_items")]:
+            for page, key in [("first page", None), ("page after cursor", after)]:
+                query, sort, hint, min_key = server.menu_items_query(active_only, key)
+                self.explain_find(f"{endpoint} {page}", "menu_items", query, sort, {"_id": 0}, hint, min_key)
+        self.explain_count("delete_category item count", "menu_items", {"category_id": self.category_ids[0]})
+        self.explain_find("menu item lookup by id", "menu_items", {"id": "missing"})
+        self.explain_find("category lookup by id", "categories", {"id": "missing"})
+        self.explain_find("user lookup by username", "users", {"username": "user1"})
+
+    def test_dashboard_queries(self):
+        print("\n=== DASHBOARD STATS ===")
+        waitress_id = self.waitress_ids[0]
+        self.explain_count("total_orders (waitress)", "orders", {"waitress_id": waitress_id})
+        for order_status in ["pending", "confirmed", "preparing", "ready"]:
+            self.explain_count(f"{order_status}_orders (all)", "orders", {"status": order_status})
+            self.explain_count(f"{order_status}_orders (waitress)", "orders",
+                               {"waitress_id": waitress_id, "status": order_status})
+        self.explain_count("total_categories", "categories", {"is_active": True})
+        self.explain_count("total_menu_items", "menu_items", {"available": True})
+
+    def run_all_tests(self):
+        print("🚀 STARTING QUERY PLAN REGRESSION TEST")
+        print("=" * 80)
+        try:
+            build_info = self.client.admin.command("buildInfo")
+        except PyMongoError as e:
+            # No plans were checked; never let that pass as a green run
+            self.log_test("Connect to mongod", False, f"{MONGO_URL}: {e}")
+            return False
+        print(f"mongod {build_info['version']} at {MONGO_URL}")
+        try:
+            self.seed_data()
+            self.test_order_queries()
+            self.test_menu_queries()
+            self.test_dashboard_queries()
+        finally:
+            self.client.drop_database(SCRATCH_DB_NAME)
+
+        failed_tests = [test for test in self.test_results if not test["success"]]
+        print("\n" + "=" * 80)
+        print(f"✅ PASSED: {len(self.test_results) - len(failed_tests)}")
+        print(f"❌ FAILED: {len(failed_tests)}")
+        for test in failed_tests:
+            print(f"   ❌ {test['test']}: {test['message']}")
+        return len(failed_tests) == 0
+
+if __name__ == "__main__":
+    tester = QueryPlanTester()
+    sys.exit(0 if tester.run_all_tests() else 1)
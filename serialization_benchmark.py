@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Menu Serialization Benchmark
+Compares per-request CPU time for serving a 1,000-item menu the old way (build one
+MenuItemWithCategory per item, re-validate against response_model, jsonable_encoder +
+json.dumps) with the trusted-document path (orjson, encoded once per menu snapshot).
+Runs offline; no database or server needed.
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "serialization_benchmark")
+
+import orjson  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import server  # noqa: E402
+
+def build_menu_items(count=1000):
+    """Menu item documents as stored, with their denormalized category fields"""
+    categories = [
+        {"id": str(uuid.uuid4()), "name": f"category_{i}", "display_name": f"Категория {i}", "emoji": "🍽️",
+         "description": None, "department": "kitchen" if i < 5 else "bar", "sort_order": i, "is_active": True,
+         "created_at": datetime.utcnow()}
+        for i in range(10)
+    ]
+    items = []
+    for i in range(count):
+        category = categories[i % len(categories)]
+        items.append({
+            "id": str(uuid.uuid4()), "name": f"Menu item {i:04d}", "description": "House special " * 4,
+            "price": 9.99 + i % 20, "category_id": category["id"], **server.category_fields(category),
+            "item_type": "food" if category["department"] == "kitchen" else "drink",
+            "available": True, "on_stop_list": False, "bottle_available": False, "bottle_price": None,
+            "image_url": None, "created_at": datetime.utcnow(), "updated_at": datetime.utcnow()
+        })
+    items.sort(key=lambda item: (item["category_sort_order"], item["category_id"], item["name"], item["id"]))
+    return items, categories
+
+def old_path(menu_items, adapter):
+    """Handler builds models field by field, FastAPI re-validates and JSON-encodes them"""
+    result = [server.MenuItemWithCategory(**server.menu_item_with_category(item)) for item in menu_items]
+    validated = adapter.validate_python([item.model_dump() for item in result])
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def new_path_cold(menu_items, categories):
+    """Trusted documents encoded with orjson (first request after a menu change)"""
+    snapshot = server.MenuSnapshot(1, menu_items, categories)
+    return snapshot.encoded("menu", snapshot.menu)
+
+def new_path_warm(snapshot):
+    """Every later request reuses the bytes encoded for the current snapshot"""
+    return snapshot.encoded("menu", snapshot.menu)
+
+def measure(label, func, iterations):
+    func()  # warm-up
+    started = time.process_time()
+    for _ in range(iterations):
+        body = func()
+    cpu_ms = (time.process_time() - started) * 1000 / iterations
+    print(f"   {label:<44}{cpu_ms:>10.3f} ms CPU/request   ({len(body) / 1024:.0f} KiB)")
+    return cpu_ms
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print(f"🚀 MENU SERIALIZATION BENCHMARK ({count} items, {iterations} iterations)")
+    print("=" * 80)
+
+    menu_items, categories = build_menu_items(count)
+    adapter = TypeAdapter(List[server.MenuItemWithCategory])
+    snapshot = server.MenuSnapshot(1, menu_items, categories)
+
+    before = measure("before: models + response_model + json", lambda: old_path(menu_items, adapter), iterations)
+    cold = measure("after: snapshot build + orjson (cold)", lambda: new_path_cold(menu_items, categories), iterations)
+    warm = measure("after: cached snapshot bytes (warm)", lambda: new_path_warm(snapshot), iterations * 100)
+
+    assert orjson.loads(new_path_warm(snapshot)) == json.loads(old_path(menu_items, adapter))
+    print("=" * 80)
+    print(f"✅ Same JSON payload; cold path uses {before / cold:.1f}x less CPU, "
+          f"warm requests {warm * 1000:.1f} µs instead of {before:.1f} ms")
+
+if __name__ == "__main__":
+    main()